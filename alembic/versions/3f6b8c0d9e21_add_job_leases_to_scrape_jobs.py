@@ -0,0 +1,48 @@
+"""add job leases to scrape_jobs
+
+Revision ID: 3f6b8c0d9e21
+Revises: a9d4e2b5c318
+Create Date: 2026-10-18 14:08:37.220914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6b8c0d9e21'
+down_revision: Union[str, None] = 'a9d4e2b5c318'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("scrape_jobs", sa.Column("claimed_by", sa.Text(), nullable=True))
+    op.add_column("scrape_jobs", sa.Column("lease_expires_at", sa.DateTime(timezone=True), nullable=True))
+    # The reaper only ever looks at leased rows
+    op.create_index(
+        "ix_scrape_jobs_lease_expires_at",
+        "scrape_jobs",
+        ["lease_expires_at"],
+        postgresql_where=sa.text("lease_expires_at IS NOT NULL"),
+    )
+
+    # Jobs stranded in a running status by earlier crashes get an already
+    # expired lease, so the first reaper pass puts them back in the queue
+    op.execute(
+        """
+        UPDATE scrape_jobs
+        SET lease_expires_at = now()
+        WHERE status IN ('USER_CREATION_RUNNING', 'USER_SEED_RUNNING', 'POSTS_SEED_RUNNING')
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_scrape_jobs_lease_expires_at", table_name="scrape_jobs")
+    op.drop_column("scrape_jobs", "lease_expires_at")
+    op.drop_column("scrape_jobs", "claimed_by")
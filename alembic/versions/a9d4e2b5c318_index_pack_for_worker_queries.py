@@ -0,0 +1,51 @@
+"""index pack for worker queries
+
+Revision ID: a9d4e2b5c318
+Revises: e4b9a1d07f3c
+Create Date: 2026-10-18 13:26:51.604118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d4e2b5c318'
+down_revision: Union[str, None] = 'e4b9a1d07f3c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Queue polling: only PENDING rows, already in claim order. Stays small
+    # however many finished jobs pile up in scrape_jobs.
+    op.create_index(
+        "ix_scrape_jobs_pending_queue",
+        "scrape_jobs",
+        ["job_type", "created_at", "id"],
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+    # Every other (job_type, status) lookup, e.g. USER_SEEDED profiles for post seeding
+    op.create_index(
+        "ix_scrape_jobs_type_status_created",
+        "scrape_jobs",
+        ["job_type", "status", "created_at"],
+    )
+    op.create_index(
+        "ix_posts_metadata_posted_by",
+        "posts_metadata",
+        ["posted_by"],
+    )
+    # post_media.post_shortcode is the leading column of uq_post_media_index,
+    # and scrape_jobs.entity_key joins through uq_scrape_jobs_job_type_entity_key:
+    # neither needs an index of its own.
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_posts_metadata_posted_by", table_name="posts_metadata")
+    op.drop_index("ix_scrape_jobs_type_status_created", table_name="scrape_jobs")
+    op.drop_index("ix_scrape_jobs_pending_queue", table_name="scrape_jobs")
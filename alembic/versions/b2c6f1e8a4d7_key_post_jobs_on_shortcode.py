@@ -0,0 +1,69 @@
+"""key post jobs on shortcode
+
+Revision ID: b2c6f1e8a4d7
+Revises: 3f6b8c0d9e21
+Create Date: 2026-10-18 16:42:11.508317
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2c6f1e8a4d7'
+down_revision: Union[str, None] = '3f6b8c0d9e21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Same forms as src/app/services/url_canonical.py
+SHORTCODE_SQL = r"""
+    CASE
+        WHEN entity_key ~ '^[A-Za-z0-9_-]+$' THEN entity_key
+        ELSE substring(
+            entity_key from
+            '(?i)^\s*(?:https?://)?(?:www\.|m\.)?(?:instagram\.com|instagr\.am)/(?:[A-Za-z0-9_.]+/)?(?:p|reels?|tv)/([A-Za-z0-9_-]+)'
+        )
+    END
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # URL variants of one post collapse into a single job. Keep the one that
+    # got furthest (anything but PENDING), then the oldest.
+    op.execute(
+        f"""
+        DELETE FROM scrape_jobs
+        USING (
+            SELECT id, row_number() OVER (
+                PARTITION BY {SHORTCODE_SQL}
+                ORDER BY (status = 'PENDING'), id
+            ) AS rank
+            FROM scrape_jobs
+            WHERE job_type = 'POST' AND {SHORTCODE_SQL} IS NOT NULL
+        ) AS ranked
+        WHERE scrape_jobs.id = ranked.id AND ranked.rank > 1
+        """
+    )
+    op.execute(
+        f"""
+        UPDATE scrape_jobs
+        SET entity_key = {SHORTCODE_SQL}
+        WHERE job_type = 'POST' AND entity_key <> {SHORTCODE_SQL}
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Merged duplicates are gone; each job gets its canonical URL back
+    op.execute(
+        """
+        UPDATE scrape_jobs
+        SET entity_key = 'https://www.instagram.com/p/' || entity_key || '/'
+        WHERE job_type = 'POST' AND entity_key ~ '^[A-Za-z0-9_-]+$'
+        """
+    )
@@ -0,0 +1,36 @@
+"""add pagination checkpoint to scrape jobs
+
+Revision ID: bd6c3dd33787
+Revises: fd374f205fd9
+Create Date: 2026-10-18 09:12:41.530118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bd6c3dd33787'
+down_revision: Union[str, None] = 'fd374f205fd9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # next_max_id of the last persisted feed page
+    op.add_column("scrape_jobs", sa.Column("checkpoint_cursor", sa.Text(), nullable=True))
+    op.add_column("scrape_jobs", sa.Column("checkpoint_page", sa.Integer(), nullable=True))
+    op.add_column(
+        "scrape_jobs",
+        sa.Column("checkpoint_discovered", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("scrape_jobs", "checkpoint_discovered")
+    op.drop_column("scrape_jobs", "checkpoint_page")
+    op.drop_column("scrape_jobs", "checkpoint_cursor")
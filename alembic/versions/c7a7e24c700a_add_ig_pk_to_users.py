@@ -0,0 +1,30 @@
+"""add ig_pk to users
+
+Revision ID: c7a7e24c700a
+Revises: bd6c3dd33787
+Create Date: 2026-10-18 11:03:27.914422
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7a7e24c700a'
+down_revision: Union[str, None] = 'bd6c3dd33787'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("users", sa.Column("ig_pk", sa.String(length=32), nullable=True))
+    op.create_index("ix_users_ig_pk", "users", ["ig_pk"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_users_ig_pk", table_name="users")
+    op.drop_column("users", "ig_pk")
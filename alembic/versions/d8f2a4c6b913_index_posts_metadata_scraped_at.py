@@ -0,0 +1,33 @@
+"""index posts_metadata scraped_at
+
+Revision ID: d8f2a4c6b913
+Revises: b2c6f1e8a4d7
+Create Date: 2026-10-18 17:20:45.331902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8f2a4c6b913'
+down_revision: Union[str, None] = 'b2c6f1e8a4d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Incremental seen-filter refresh reads only posts scraped since its watermark
+    op.create_index(
+        "ix_posts_metadata_scraped_at",
+        "posts_metadata",
+        ["scraped_at"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_posts_metadata_scraped_at", table_name="posts_metadata")
@@ -0,0 +1,84 @@
+"""jsonb collaborators and tagged_users
+
+Revision ID: e4b9a1d07f3c
+Revises: c7a7e24c700a
+Create Date: 2026-10-18 12:41:09.351872
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b9a1d07f3c'
+down_revision: Union[str, None] = 'c7a7e24c700a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing values were written with json.dumps, so the cast is lossless
+    op.alter_column(
+        "posts_metadata",
+        "collaborators",
+        type_=postgresql.JSONB(),
+        existing_type=sa.Text(),
+        existing_nullable=False,
+        postgresql_using="collaborators::jsonb",
+        server_default=sa.text("'[]'::jsonb"),
+    )
+    op.alter_column(
+        "post_media",
+        "tagged_users",
+        type_=postgresql.JSONB(),
+        existing_type=sa.Text(),
+        existing_nullable=False,
+        postgresql_using="tagged_users::jsonb",
+        server_default=sa.text("'[]'::jsonb"),
+    )
+
+    # jsonb_path_ops only serves @> containment, which is all the lookups use,
+    # and is several times smaller than the default jsonb_ops
+    op.create_index(
+        "ix_posts_metadata_collaborators",
+        "posts_metadata",
+        ["collaborators"],
+        postgresql_using="gin",
+        postgresql_ops={"collaborators": "jsonb_path_ops"},
+    )
+    op.create_index(
+        "ix_post_media_tagged_users",
+        "post_media",
+        ["tagged_users"],
+        postgresql_using="gin",
+        postgresql_ops={"tagged_users": "jsonb_path_ops"},
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_post_media_tagged_users", table_name="post_media")
+    op.drop_index("ix_posts_metadata_collaborators", table_name="posts_metadata")
+
+    op.alter_column(
+        "post_media",
+        "tagged_users",
+        type_=sa.Text(),
+        existing_type=postgresql.JSONB(),
+        existing_nullable=False,
+        postgresql_using="tagged_users::text",
+        server_default=None,
+    )
+    op.alter_column(
+        "posts_metadata",
+        "collaborators",
+        type_=sa.Text(),
+        existing_type=postgresql.JSONB(),
+        existing_nullable=False,
+        postgresql_using="collaborators::text",
+        server_default=None,
+    )
@@ -0,0 +1,38 @@
+"""add search_query_stats
+
+Revision ID: f1a7c3e9d254
+Revises: d8f2a4c6b913
+Create Date: 2026-10-18 18:05:12.744196
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a7c3e9d254'
+down_revision: Union[str, None] = 'd8f2a4c6b913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "search_query_stats",
+        sa.Column("pattern", sa.Text(), nullable=False),
+        sa.Column("last_query", sa.Text(), nullable=False),
+        sa.Column("runs", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("pages", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("results", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("new_shortcodes", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("pattern"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("search_query_stats")
@@ -0,0 +1,89 @@
+"""
+Benchmark of post URL canonicalization: URLs per second for the regex fast
+path (canonical_shortcodes) against full URL parsing of every URL, on a
+synthetic batch mixing the forms search results return.
+
+    python scripts/bench_canonical.py [--urls 1000000] [--repeat 3]
+
+Also checks that both paths agree on every URL and prints the dedup ratio
+of the batch against the old split("?")[0] key.
+"""
+
+import argparse
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to sys.path to allow imports from src
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from src.app.services.url_canonical import _shortcode_from_parsed, canonical_shortcodes
+
+FORMS = [
+    "https://www.instagram.com/p/{sc}/",
+    "https://www.instagram.com/p/{sc}/?utm_source=ig_web_copy_link",
+    "https://instagram.com/reel/{sc}",
+    "https://www.instagram.com/reels/{sc}/",
+    "https://www.instagram.com/tv/{sc}/",
+    "https://m.instagram.com/p/{sc}/?igsh=MTc4",
+    "https://www.instagram.com/{user}/p/{sc}/",
+    "https://www.instagram.com/{user}/reel/{sc}/?hl=en",
+    "http://WWW.INSTAGRAM.COM/p/{sc}",
+    "https://www.instagram.com:443/p/{sc}/",
+]
+SHORTCODE_CHARS = string.ascii_letters + string.digits + "_-"
+
+
+def make_batch(n: int, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    # Each post shows up in about 3 URL forms, like repeated search hits
+    posts = ["".join(rng.choices(SHORTCODE_CHARS, k=11)) for _ in range(max(1, n // 3))]
+    users = [f"user_{i}" for i in range(1000)]
+    return [
+        rng.choice(FORMS).format(sc=rng.choice(posts), user=rng.choice(users))
+        for _ in range(n)
+    ]
+
+
+def timed(fn, repeat: int) -> tuple[float, object]:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started_at)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    urls = make_batch(args.urls)
+    print(f"{len(urls)} URLs, best of {args.repeat}:\n")
+
+    slow_time, slow = timed(lambda: [_shortcode_from_parsed(url) for url in urls], args.repeat)
+    fast_time, (shortcodes, rejected) = timed(lambda: canonical_shortcodes(urls), args.repeat)
+
+    print(f"{'path':<12}{'seconds':>10}{'URLs/s':>14}")
+    print(f"{'urlparse':<12}{slow_time:>10.2f}{len(urls) / slow_time:>14,.0f}")
+    print(f"{'fast path':<12}{fast_time:>10.2f}{len(urls) / fast_time:>14,.0f}")
+    print(f"\nspeedup: {slow_time / fast_time:.1f}x")
+
+    if rejected or shortcodes != slow:
+        mismatches = sum(1 for a, b in zip(shortcodes, slow) if a != b)
+        print(f"!! paths disagree: {mismatches} mismatches, {len(rejected)} rejected")
+        sys.exit(1)
+
+    old_keys = len({url.split("?")[0] for url in urls})
+    new_keys = len(set(shortcodes))
+    print(f"jobs: {old_keys} keyed on split('?')[0], {new_keys} keyed on shortcode "
+          f"({old_keys - new_keys} duplicate fetches avoided)")
+
+
+if __name__ == "__main__":
+    main()
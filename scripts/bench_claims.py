@@ -0,0 +1,119 @@
+"""
+Benchmark of queue claiming: claims per second for each batch size K and
+worker count.
+
+For every (workers, K) pair this seeds a fresh set of PENDING POST jobs in
+a scratch Postgres schema. It then starts `workers` processes that loop
+claim_batch(K) -> finish_jobs() until the queue is empty, with no real work
+in between. The result is pure queue overhead: each claim costs one
+UPDATE ... RETURNING and each outcome report one bulk UPDATE.
+
+    python scripts/bench_claims.py [--jobs 20000] [--batch-sizes 1,10,50,100] [--workers 1,4,8]
+
+Uses the DATABASE_* settings. Point them at a local database, not production.
+"""
+
+import argparse
+import multiprocessing
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to sys.path to allow imports from src
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from src.app.core.db.base import Base
+from src.app.core.db.session import DATABASE_URL
+from src.app.jobs.queue import POST_STAGE, claim_batch, finish_jobs
+
+SCHEMA = "bench_claims"
+
+
+def scratch_engine():
+    return create_engine(DATABASE_URL, connect_args={"options": f"-csearch_path={SCHEMA}"})
+
+
+def seed(jobs: int) -> None:
+    with scratch_engine().begin() as conn:
+        conn.execute(text("TRUNCATE scrape_jobs RESTART IDENTITY"))
+        conn.execute(text(f"""
+            INSERT INTO scrape_jobs (job_type, entity_key, source, status, created_at)
+            SELECT 'POST', 'bench' || g, 'GOOGLE', 'PENDING',
+                   now() - ({jobs} - g) * interval '1 millisecond'
+            FROM generate_series(1, {jobs}) g
+        """))
+        conn.execute(text("ANALYZE scrape_jobs"))
+
+
+def drain(k: int, claimed) -> None:
+    """
+    Worker process: claim and finish until nothing is left.
+    """
+    engine = scratch_engine()
+    db = sessionmaker(bind=engine, autoflush=False)()
+    count = 0
+    try:
+        while True:
+            jobs = claim_batch(db, POST_STAGE, k)
+            if not jobs:
+                break
+            finish_jobs(db, [(job, POST_STAGE.done, None) for job in jobs])
+            count += len(jobs)
+    finally:
+        db.close()
+        engine.dispose()
+    with claimed.get_lock():
+        claimed.value += count
+
+
+def run(workers: int, k: int, jobs: int) -> float:
+    seed(jobs)
+    claimed = multiprocessing.Value("i", 0)
+    processes = [multiprocessing.Process(target=drain, args=(k, claimed)) for _ in range(workers)]
+
+    started_at = time.perf_counter()
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - started_at
+
+    if claimed.value != jobs:
+        print(f"  !! {claimed.value} jobs claimed, expected {jobs}")
+    return claimed.value / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=20_000)
+    parser.add_argument("--batch-sizes", default="1,10,50,100")
+    parser.add_argument("--workers", default="1,4,8")
+    args = parser.parse_args()
+
+    batch_sizes = [int(k) for k in args.batch_sizes.split(",")]
+    worker_counts = [int(n) for n in args.workers.split(",")]
+
+    admin = create_engine(DATABASE_URL)
+    with admin.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    with scratch_engine().begin() as conn:
+        Base.metadata.create_all(conn)
+
+    try:
+        print(f"{args.jobs} jobs per run, claims/second:\n")
+        print("workers " + "".join(f"{'K=' + str(k):>10}" for k in batch_sizes))
+        for workers in worker_counts:
+            rates = [run(workers, k, args.jobs) for k in batch_sizes]
+            print(f"{workers:>7} " + "".join(f"{rate:>10.0f}" for rate in rates))
+    finally:
+        with admin.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
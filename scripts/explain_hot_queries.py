@@ -0,0 +1,248 @@
+"""
+Manual EXPLAIN check of the hot worker queries. Not run by any test or CI:
+run it by hand against a local Postgres after changing queries or indexes.
+
+Builds the schema from the models in a scratch Postgres schema, seeds a
+large synthetic dataset, ANALYZEs it, and checks the plan of each hot query
+for the expected index and no sequential scan of the queried table. Exits
+non-zero if any plan misses its index. The scratch schema is dropped
+afterwards unless --keep is passed.
+
+The schema comes from the model declarations, which mirror migration
+a9d4e2b5c318; it does not prove a database was migrated. For that, compare
+`alembic upgrade head --sql` with the indexes listed here.
+
+    python scripts/explain_hot_queries.py [--jobs 500000] [--users 50000] [--posts 500000]
+
+Uses the DATABASE_* settings. Point them at a local database, not production.
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to sys.path to allow imports from src
+project_root = Path(__file__).resolve().parent.parent
+sys.path.append(str(project_root))
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects import postgresql
+
+from src.app.core.db.base import Base
+from src.app.core.db.models import (
+    PostMedia,
+    PostsMetadata,
+    ScrapeJob,
+    ScrapeJobStatus,
+    ScrapeJobType,
+    User,
+)
+from src.app.core.db.session import engine
+from src.app.jobs.queue import POST_STAGE, POSTS_STAGE, PROFILE_STAGE, claimable
+
+SCHEMA = "explain_harness"
+
+INDEX_NODES = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+
+def seed(conn, jobs: int, users: int, posts: int) -> None:
+    # Mostly finished jobs with a thin PENDING tail, like a long-running install
+    conn.execute(text(f"""
+        INSERT INTO users (id, username, profile_url, is_verified, ig_pk)
+        SELECT g, 'user_' || g, 'https://www.instagram.com/user_' || g, false, (1000000 + g)::text
+        FROM generate_series(1, {users}) g
+    """))
+    conn.execute(text(f"""
+        INSERT INTO scrape_jobs (id, job_type, entity_key, source, status, created_at)
+        SELECT
+            g,
+            CASE WHEN g % 2 = 0 THEN 'PROFILE' ELSE 'POST' END::scrapejobtype,
+            CASE WHEN g % 2 = 0 THEN 'user_' || (g / 2) ELSE 'sc' || g END,
+            'GOOGLE'::scrapejobsource,
+            (CASE
+                WHEN g % 100 = 0 THEN 'PENDING'
+                WHEN g % 100 = 1 THEN 'USER_SEEDED'
+                WHEN g % 100 = 2 THEN 'POSTS_SEEDED_FAILED'
+                WHEN g % 100 < 10 THEN 'FAILED'
+                ELSE 'SCRAPE_DONE'
+            END)::scrapejobstatus,
+            now() - ({jobs} - g) * interval '1 second'
+        FROM generate_series(1, {jobs}) g
+    """))
+    conn.execute(text(f"""
+        INSERT INTO posts_metadata (shortcode, posted_by, content_kind, is_container, collaborators, is_deleted, scraped_at)
+        SELECT
+            'sc' || g,
+            1 + g % {users},
+            'post',
+            g % 3 = 0,
+            CASE WHEN g % 50 = 0 THEN jsonb_build_array('user_' || (g % 997)) ELSE '[]'::jsonb END,
+            false,
+            now() - ({posts} - g) * interval '1 minute'
+        FROM generate_series(1, {posts}) g
+    """))
+    conn.execute(text(f"""
+        INSERT INTO post_media (post_shortcode, media_url, media_type, media_index, tagged_users)
+        SELECT
+            'sc' || g,
+            'https://cdn.example/' || g || '/' || i,
+            'image',
+            i,
+            CASE WHEN (g + i) % 40 = 0 THEN jsonb_build_array('user_' || (g % 991)) ELSE '[]'::jsonb END
+        FROM generate_series(1, {posts}) g, generate_series(0, 1) i
+    """))
+    conn.execute(text("ANALYZE"))
+
+
+def hot_queries():
+    """
+    (name, statement, table that must not be seq-scanned, acceptable indexes)
+    """
+    return [
+        (
+            "post queue claim (worker.py)",
+            claimable(POST_STAGE).limit(1).with_for_update(skip_locked=True),
+            "scrape_jobs",
+            "ix_scrape_jobs_pending_queue",
+        ),
+        (
+            "profile queue claim (profile_worker)",
+            claimable(PROFILE_STAGE).limit(1).with_for_update(skip_locked=True),
+            "scrape_jobs",
+            "ix_scrape_jobs_pending_queue",
+        ),
+        (
+            "posts queue claim (post_seed_worker)",
+            claimable(POSTS_STAGE).limit(1).with_for_update(skip_locked=True),
+            "scrape_jobs",
+            "ix_scrape_jobs_type_status_created",
+        ),
+        (
+            "users to post-seed (post_seed_worker.run_worker)",
+            select(User)
+            .join(
+                ScrapeJob,
+                (ScrapeJob.entity_key == User.username) &
+                (ScrapeJob.job_type == POSTS_STAGE.job_type) &
+                (ScrapeJob.status == POSTS_STAGE.ready)
+            ),
+            "scrape_jobs",
+            ("ix_scrape_jobs_type_status_created", "uq_scrape_jobs_job_type_entity_key"),
+        ),
+        (
+            "expired leases (queue.reap_expired_leases)",
+            select(ScrapeJob.id).where(
+                ScrapeJob.job_type == ScrapeJobType.PROFILE,
+                ScrapeJob.status == ScrapeJobStatus.POSTS_SEED_RUNNING,
+                ScrapeJob.lease_expires_at < func.now(),
+            ),
+            "scrape_jobs",
+            ("ix_scrape_jobs_lease_expires_at", "ix_scrape_jobs_type_status_created"),
+        ),
+        (
+            "profile job by username (post_seed_worker)",
+            select(ScrapeJob).where(ScrapeJob.job_type == ScrapeJobType.PROFILE, ScrapeJob.entity_key == "user_42"),
+            "scrape_jobs",
+            "uq_scrape_jobs_job_type_entity_key",
+        ),
+        (
+            "posts by owner",
+            select(PostsMetadata).where(PostsMetadata.posted_by == 42),
+            "posts_metadata",
+            "ix_posts_metadata_posted_by",
+        ),
+        (
+            "posts since watermark (seen_filter.refresh)",
+            select(PostsMetadata.shortcode, PostsMetadata.scraped_at)
+            .where(PostsMetadata.scraped_at > func.now() - text("interval '1 hour'")),
+            "posts_metadata",
+            "ix_posts_metadata_scraped_at",
+        ),
+        (
+            "media by post",
+            select(PostMedia).where(PostMedia.post_shortcode.in_(["sc10", "sc11", "sc12"])),
+            "post_media",
+            "uq_post_media_index",
+        ),
+        (
+            "posts collaborating with (post_queries)",
+            select(PostsMetadata).where(PostsMetadata.collaborators.contains(["user_7"])),
+            "posts_metadata",
+            "ix_posts_metadata_collaborators",
+        ),
+        (
+            "media tagging (post_queries)",
+            select(PostMedia.post_shortcode).where(PostMedia.tagged_users.contains(["user_7"])),
+            "post_media",
+            "ix_post_media_tagged_users",
+        ),
+    ]
+
+
+def walk(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from walk(child)
+
+
+def check(conn, name: str, statement, table: str, indexes) -> bool:
+    sql = str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    nodes = list(walk(plan[0]["Plan"]))
+
+    seq_scans = [n for n in nodes if n["Node Type"] == "Seq Scan" and n.get("Relation Name") == table]
+    used = {n.get("Index Name") for n in nodes if n["Node Type"] in INDEX_NODES}
+    if isinstance(indexes, str):
+        indexes = (indexes,)
+    ok = not seq_scans and bool(used & set(indexes))
+
+    print(f"[{'OK' if ok else 'FAIL'}] {name}")
+    print(f"       indexes used: {sorted(i for i in used if i) or 'none'}")
+    if not ok:
+        print(f"       expected one of {list(indexes)} and no Seq Scan on {table}. Plan:")
+        for n in nodes:
+            print(f"         {n['Node Type']} {n.get('Relation Name') or ''} {n.get('Index Name') or ''}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=500_000)
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--posts", type=int, default=500_000)
+    parser.add_argument("--keep", action="store_true", help=f"keep the {SCHEMA} schema afterwards")
+    args = parser.parse_args()
+
+    with engine.connect() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        # Tables and enum types land in the scratch schema, queries resolve there
+        conn.execute(text(f"SET search_path TO {SCHEMA}"))
+        try:
+            Base.metadata.create_all(conn)
+
+            started_at = time.perf_counter()
+            seed(conn, args.jobs, args.users, args.posts)
+            conn.commit()
+            print(f"Seeded {args.jobs} jobs, {args.users} users, {args.posts} posts "
+                  f"in {time.perf_counter() - started_at:.1f}s\n")
+
+            conn.execute(text(f"SET search_path TO {SCHEMA}"))
+            results = [check(conn, *query) for query in hot_queries()]
+        finally:
+            conn.rollback()
+            if not args.keep:
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+                conn.commit()
+
+    failed = results.count(False)
+    print(f"\n{len(results) - failed}/{len(results)} hot queries use their indexes")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -20,6 +20,13 @@ class Settings(BaseSettings):
     # Google
     GOOGLE_API_KEY : str
     GOOGLE_CSE_ID : str
+    GOOGLE_SEARCH_MAX_IN_FLIGHT: int = 4  # concurrent Custom Search requests per process
+    GOOGLE_SEARCH_CACHE_ENABLED: bool = True
+    GOOGLE_SEARCH_CACHE_PATH: str = "search_cache/google.sqlite"
+    GOOGLE_SEARCH_CACHE_TTL_SECONDS: int = 7 * 24 * 3600  # result pages older than this are fetched again
+    GOOGLE_SEARCH_MIN_PAGE_YIELD: float = 0.2  # stop paging a query once under this share of new shortcodes per page
+    GOOGLE_SEARCH_YIELD_MIN_PAGES: int = 3  # pages of history before a query pattern can be down-ranked
+    GOOGLE_SEARCH_PROBE_LIMIT: int = 10  # results fetched for a down-ranked (low-yield) query pattern
 
     # Email
     EMAIL_SERVER: str
@@ -28,6 +35,50 @@ class Settings(BaseSettings):
     EMAIL_PASSWORD: str
     EMAIL_RECIPIENT: str
 
+    # Instagram client
+    IG_MAX_IN_FLIGHT: int = 4  # concurrent requests per process (async client)
+    IG_REQUESTS_PER_HOUR: float = 100  # outbound budget for the whole deployment (one account / IP)
+    IG_INSTANCES: int = 1  # worker processes running at once; each paces itself at IG_REQUESTS_PER_HOUR / IG_INSTANCES
+    IG_REQUEST_BURST: int = 3  # tokens that can accumulate while idle (lets hedged requests through)
+    IG_REQUESTS_PER_HOUR_FLOOR: float = 10  # lowest total rate the adaptive controller backs off to
+    IG_RATE_DECREASE_FACTOR: float = 0.5  # multiplicative cut on 429 / 5xx
+    IG_RATE_RECOVERY_PER_SUCCESS: float = 1.0  # requests/hour added back per successful response
+    IG_MAX_RATE_LIMIT_RETRIES: int = 5  # consecutive 429s on one page before the job is failed
+    IG_RETRY_MAX_ATTEMPTS: int = 3  # per request, transient failures only
+    IG_RETRY_BASE_DELAY: float = 5.0  # seconds, doubled per attempt with jitter
+    IG_RETRY_MAX_DELAY: float = 60.0
+    IG_BREAKER_FAILURE_THRESHOLD: int = 5  # consecutive transient failures that open an endpoint's circuit
+    IG_BREAKER_RESET_SECONDS: float = 300  # open circuit fails fast this long before a probe
+    IG_CSRF_REFRESH_MARGIN: float = 24 * 3600  # refresh csrftoken this many seconds before it expires
+    IG_PK_CACHE_SIZE: int = 50_000  # username -> PK entries kept in memory
+
+    # Raw payload archive
+    RAW_ARCHIVE_ENABLED: bool = True
+    RAW_ARCHIVE_DIR: str = "raw_archive"
+    RAW_ARCHIVE_SEGMENT_BYTES: int = 64 * 1024 * 1024  # rotate segments at 64MB
+
+    # Seen-shortcode filter (discovery dedup without DB round trips)
+    SEEN_FILTER_ENABLED: bool = True
+    SEEN_FILTER_PATH: str = "seen_filter/shortcodes.bloom"
+    SEEN_FILTER_CAPACITY: int = 10_000_000  # shortcodes before the file is rebuilt at twice the size
+    SEEN_FILTER_FP_RATE: float = 0.001  # share of new posts wrongly dropped as already seen
+
+    # Post seeding
+    POSTS_SEED_INCREMENTAL: bool = False
+    POSTS_INCREMENTAL_STOP_AFTER: int = 24  # consecutive already-stored posts
+
+    # Job queue
+    JOB_LEASE_SECONDS: int = 600  # a claimed job is reclaimable this long after its last heartbeat
+    JOB_HEARTBEAT_SECONDS: int = 60  # how often a running job extends its lease
+    JOB_POLL_FALLBACK_SECONDS: float = 30  # idle workers re-poll this often even without NOTIFY
+    JOB_CLAIM_BATCH_SIZE: int = 10  # jobs a fast stage (post URL -> username) leases per round trip
+    JOB_MAX_ATTEMPTS: int = 5  # failed attempts before a job is moved to DEAD
+    JOB_RETRY_TRANSIENT_SECONDS: float = 2 * 60  # first retry delay after 5xx / timeouts, doubled per attempt
+    JOB_RETRY_RATE_LIMITED_SECONDS: float = 30 * 60  # first retry delay after a 429
+    JOB_RETRY_ERROR_SECONDS: float = 60 * 60  # first retry delay after any other failure
+    JOB_RETRY_SESSION_DEAD_SECONDS: float = 15 * 60  # fixed delay after a dead session; no attempt spent
+    JOB_RETRY_MAX_SECONDS: float = 24 * 3600
+
     # Logging
     LOG_LEVEL: str = "INFO"
     LOG_FILE: str = "sys_logs/app.log"
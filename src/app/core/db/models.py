@@ -6,13 +6,15 @@ from sqlalchemy import (
     CheckConstraint,
     UniqueConstraint,
     ForeignKey,
-    DateTime
+    DateTime,
+    Index,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime, UTC
 
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from src.app.core.db.base import Base
-from sqlalchemy import func
+from sqlalchemy import func, text
 import enum
 from sqlalchemy import Enum as SAEnum
 
@@ -94,6 +96,35 @@ class ScrapeJob(Base):
         nullable=True,
     )
 
+    # Posts pagination checkpoint: next_max_id of the last persisted page
+    checkpoint_cursor: Mapped[str | None] = mapped_column(
+        Text,
+        nullable=True,
+    )
+
+    checkpoint_page: Mapped[int | None] = mapped_column(
+        Integer,
+        nullable=True,
+    )
+
+    checkpoint_discovered: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+    )
+
+    # Queue lease: which worker holds the job and until when (see jobs/queue.py)
+    claimed_by: Mapped[str | None] = mapped_column(
+        Text,
+        nullable=True,
+    )
+
+    lease_expires_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
+
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         nullable=False,
@@ -113,6 +144,24 @@ class ScrapeJob(Base):
             "entity_key",
             name="uq_scrape_jobs_job_type_entity_key",
         ),
+        Index(
+            "ix_scrape_jobs_pending_queue",
+            "job_type",
+            "created_at",
+            "id",
+            postgresql_where=text("status = 'PENDING'"),
+        ),
+        Index(
+            "ix_scrape_jobs_type_status_created",
+            "job_type",
+            "status",
+            "created_at",
+        ),
+        Index(
+            "ix_scrape_jobs_lease_expires_at",
+            "lease_expires_at",
+            postgresql_where=text("lease_expires_at IS NOT NULL"),
+        ),
     )
 
 
@@ -132,6 +181,13 @@ class User(Base):
         unique=True,
     )
 
+    # Instagram numeric user ID, never changes for an account
+    ig_pk: Mapped[str | None] = mapped_column(
+        String(32),
+        nullable=True,
+        index=True,
+    )
+
     display_name: Mapped[str | None] = mapped_column(
         String(128),
         nullable=True,
@@ -262,6 +318,7 @@ class PostsMetadata(Base):
     posted_by: Mapped[int] = mapped_column(
         Integer,
         nullable=False,
+        index=True,
     )
 
     posted_on: Mapped[datetime | None] = mapped_column(
@@ -305,16 +362,18 @@ class PostsMetadata(Base):
         nullable=False,
     )
 
-    collaborators: Mapped[str] = mapped_column(
-        Text,
+    collaborators: Mapped[list[str]] = mapped_column(
+        JSONB,
         nullable=False,
-        default="[]",   # JSON array of usernames
+        default=list,   # array of usernames
+        server_default=text("'[]'::jsonb"),
     )
 
     scraped_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         nullable=False,
         server_default=func.now(),
+        index=True,  # incremental seen-filter refresh
     )
 
     media_items: Mapped[list["PostMedia"]] = relationship(
@@ -332,6 +391,12 @@ class PostsMetadata(Base):
             "(content_kind = 'reel' AND is_container = FALSE) OR (content_kind = 'post')",
             name="ck_posts_container_validity",
         ),
+        Index(
+            "ix_posts_metadata_collaborators",
+            "collaborators",
+            postgresql_using="gin",
+            postgresql_ops={"collaborators": "jsonb_path_ops"},
+        ),
     )
 
 
@@ -373,10 +438,11 @@ class PostMedia(Base):
         nullable=False,
     )
 
-    tagged_users: Mapped[str] = mapped_column(
-        Text,
+    tagged_users: Mapped[list[str]] = mapped_column(
+        JSONB,
         nullable=False,
-        default="[]",   # JSON array of usernames
+        default=list,   # array of usernames
+        server_default=text("'[]'::jsonb"),
     )
 
     scraped_at: Mapped[datetime] = mapped_column(
@@ -399,6 +465,65 @@ class PostMedia(Base):
             "media_index",
             name="uq_post_media_index",
         ),
+        Index(
+            "ix_post_media_tagged_users",
+            "tagged_users",
+            postgresql_using="gin",
+            postgresql_ops={"tagged_users": "jsonb_path_ops"},
+        ),
+    )
+
+
+
+
+class SearchQueryStats(Base):
+    """
+    New-shortcode yield of Google search queries, aggregated per query
+    pattern across discovery runs (see services/search_yield.py).
+    """
+    __tablename__ = "search_query_stats"
+
+    pattern: Mapped[str] = mapped_column(
+        Text,
+        primary_key=True,
+    )
+
+    last_query: Mapped[str] = mapped_column(
+        Text,
+        nullable=False,
+    )
+
+    runs: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+    )
+
+    pages: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
     )
 
+    results: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+    )
 
+    new_shortcodes: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+    )
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
@@ -0,0 +1,260 @@
+"""
+Append-only archive of raw Instagram payloads.
+
+Records go to rotating segment files under <root>/segments/. Every writer
+process (any number of workers share one root) appends only to its own
+segments, named segment-<start time>-<host>-<pid>-<seq>.jsonl.gz, so the
+offsets it records are its own. Each record is
+one JSON line compressed as its own gzip member, so a segment is still a
+valid .jsonl.gz and any record can be read alone from its byte offset.
+<root>/index.sqlite maps (username, ig_pk, endpoint, cursor) to
+(segment, offset, length) for random access by user.
+
+A background thread does all disk work; record() only enqueues.
+"""
+
+import atexit
+import gzip
+import json
+import os
+import queue
+import re
+import socket
+import sqlite3
+import threading
+from datetime import datetime, UTC
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from src.app.core.config import settings
+from src.app.core.logging_config import logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    endpoint TEXT NOT NULL,
+    username TEXT,
+    ig_pk TEXT,
+    cursor TEXT,
+    fetched_at TEXT NOT NULL,
+    segment TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_records_username ON records (username, endpoint);
+CREATE INDEX IF NOT EXISTS ix_records_ig_pk ON records (ig_pk, endpoint);
+"""
+
+
+class RawArchive:
+    def __init__(self, root: str, segment_max_bytes: int, queue_size: int = 1000):
+        self.root = Path(root)
+        self.segments_dir = self.root / "segments"
+        self.index_path = self.root / "index.sqlite"
+        self.segment_max_bytes = segment_max_bytes
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._writer: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.dropped = 0
+        self._writer_id = ""
+
+    # ------------------------------------------------------------------
+    # Request path
+    # ------------------------------------------------------------------
+
+    def record(
+        self,
+        endpoint: str,
+        payload: Dict,
+        username: Optional[str] = None,
+        ig_pk: Optional[str] = None,
+        cursor: Optional[str] = None,
+    ) -> None:
+        """
+        Enqueues a payload for the writer. Never blocks: if the writer falls
+        behind, the record is dropped and counted rather than stalling a fetch.
+        """
+        self._ensure_writer()
+        entry = {
+            "endpoint": endpoint,
+            "username": username,
+            "ig_pk": str(ig_pk) if ig_pk else None,
+            "cursor": cursor,
+            "fetched_at": datetime.now(UTC).isoformat(),
+            "payload": payload,
+        }
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"Raw archive queue full, dropped {endpoint} payload ({self.dropped} dropped so far)")
+
+    # ------------------------------------------------------------------
+    # Writer thread
+    # ------------------------------------------------------------------
+
+    def _ensure_writer(self) -> None:
+        if self._writer is not None:
+            return
+        with self._start_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="raw-archive", daemon=True)
+                self._writer.start()
+                atexit.register(self.close)
+
+    def _segment_path(self, seq: int) -> Path:
+        return self.segments_dir / f"segment-{self._writer_id}-{seq:06d}.jsonl.gz"
+
+    def _open_segment(self, seq: int):
+        """
+        Opens this writer's segment seq. No other process writes to it, so
+        tell() is the true offset of the next record.
+        """
+        self.segments_dir.mkdir(parents=True, exist_ok=True)
+        path = self._segment_path(seq)
+        return path, open(path, "ab")
+
+    def _write_loop(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        index = sqlite3.connect(self.index_path)
+        index.execute("PRAGMA journal_mode=WAL")
+        index.executescript(_SCHEMA)
+        # Start time first keeps segment_names() roughly chronological; host
+        # and pid keep concurrent writers (and a reused pid) apart
+        host = re.sub(r"[^A-Za-z0-9]", "", socket.gethostname()) or "host"
+        self._writer_id = f"{datetime.now(UTC):%Y%m%dT%H%M%S}-{host}-{os.getpid()}"
+        seq = 0
+        path, segment = self._open_segment(seq)
+
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                break
+            batch = [entry]
+            # Drain what is already queued so one commit covers many records
+            while len(batch) < 100:
+                try:
+                    extra = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if extra is None:
+                    self._queue.put(None)
+                    break
+                batch.append(extra)
+
+            try:
+                rows = []
+                for entry in batch:
+                    if segment.tell() >= self.segment_max_bytes:
+                        segment.close()
+                        seq += 1
+                        path, segment = self._open_segment(seq)
+
+                    data = gzip.compress(json.dumps(entry, separators=(",", ":")).encode("utf-8") + b"\n")
+                    offset = segment.tell()
+                    segment.write(data)
+                    rows.append((
+                        entry["endpoint"], entry["username"], entry["ig_pk"], entry["cursor"],
+                        entry["fetched_at"], path.name, offset, len(data),
+                    ))
+                segment.flush()
+                index.executemany(
+                    "INSERT INTO records (endpoint, username, ig_pk, cursor, fetched_at, segment, offset, length) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                index.commit()
+            except Exception as e:
+                logger.error(f"Raw archive write failed: {e}")
+
+        segment.close()
+        index.close()
+
+    def close(self, timeout: float = 10) -> None:
+        """
+        Drains pending records and stops the writer.
+        """
+        if self._writer is None or not self._writer.is_alive():
+            return
+        self._queue.put(None)
+        self._writer.join(timeout=timeout)
+
+    # ------------------------------------------------------------------
+    # Read path (any process)
+    # ------------------------------------------------------------------
+
+    def read_at(self, segment: str, offset: int, length: int) -> Dict:
+        with open(self.segments_dir / segment, "rb") as f:
+            f.seek(offset)
+            return json.loads(gzip.decompress(f.read(length)))
+
+    def iter_records(
+        self,
+        username: Optional[str] = None,
+        ig_pk: Optional[str] = None,
+        endpoint: Optional[str] = None,
+    ) -> Iterator[Dict]:
+        """
+        Archived records for a user (by username and/or PK), oldest first.
+        """
+        clauses, params = [], []
+        for column, value in (("username", username), ("ig_pk", ig_pk), ("endpoint", endpoint)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(str(value))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        index = sqlite3.connect(f"file:{self.index_path}?mode=ro", uri=True)
+        try:
+            rows = index.execute(
+                f"SELECT segment, offset, length FROM records {where} ORDER BY id",
+                params,
+            ).fetchall()
+        finally:
+            index.close()
+
+        for segment, offset, length in rows:
+            yield self.read_at(segment, offset, length)
+
+    def iter_segment(self, segment: str) -> Iterator[Dict]:
+        """
+        Sequential scan of one segment; multi-member gzip reads as one stream.
+        A segment a live writer is still appending to can end in a partly
+        written member: the scan stops cleanly at the last complete record.
+        """
+        try:
+            with gzip.open(self.segments_dir / segment, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        break
+                    if line.strip():
+                        yield json.loads(line)
+        except (EOFError, gzip.BadGzipFile):
+            logger.warning(f"Segment {segment} ends in a truncated record (still being written?); read up to it")
+
+    def segment_names(self) -> list:
+        return sorted(path.name for path in self.segments_dir.glob("segment-*.jsonl.gz"))
+
+
+archive = RawArchive(
+    root=settings.RAW_ARCHIVE_DIR,
+    segment_max_bytes=settings.RAW_ARCHIVE_SEGMENT_BYTES,
+)
+
+
+def archive_payload(
+    endpoint: str,
+    payload: Dict,
+    username: Optional[str] = None,
+    ig_pk: Optional[str] = None,
+    cursor: Optional[str] = None,
+) -> None:
+    """
+    Archives a raw payload when RAW_ARCHIVE_ENABLED; never raises.
+    """
+    if not settings.RAW_ARCHIVE_ENABLED or payload is None:
+        return
+    try:
+        archive.record(endpoint, payload, username=username, ig_pk=ig_pk, cursor=cursor)
+    except Exception as e:
+        logger.error(f"Failed to archive {endpoint} payload: {e}")
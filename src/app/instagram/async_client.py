@@ -0,0 +1,163 @@
+"""
+asyncio Instagram client on one pooled HTTP/2 httpx.AsyncClient, so a single
+worker process keeps several users in flight (profile_worker --concurrency).
+Status strings are the same as the blocking client: active, session_dead,
+rate_limited, server_error, error, timeout, connection_error.
+
+Cookies and headers come from the process-wide session manager, so a
+refreshed login on disk reaches both clients, and every request takes a
+token from the same governor. Profile-ID resolution and feed pagination
+stay on the blocking path (hedged resolver, ig_pk cache, pipelined seed).
+"""
+
+import asyncio
+from typing import Awaitable, Iterable, List, Optional, Tuple, TypeVar, Union
+
+import httpx
+
+from src.app.core.config import settings
+from src.app.instagram.archive import archive_payload
+from src.app.instagram.client import GovernedSession, classify_feed_status
+from src.app.instagram.retry import call_with_retry_async
+from src.app.instagram.rate_governor import governor, rate_controller
+from src.app.instagram.session_manager import session_manager
+from src.app.jobs.queue import JobFailure
+
+T = TypeVar("T")
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+async def _acquire_token(request: httpx.Request) -> None:
+    # Same process-wide budget as the blocking GovernedSession
+    await governor.acquire_async()
+
+
+async def _observe_response(response: httpx.Response) -> None:
+    rate_controller.observe(response.status_code, response.headers.get("Retry-After"))
+
+
+def _sync_session(client: httpx.AsyncClient, session: GovernedSession) -> None:
+    """
+    Copies the blocking session's cookies (including a refreshed csrftoken)
+    and login headers onto the async client.
+    """
+    jar = httpx.Cookies()
+    for cookie in session.cookies:
+        jar.set(cookie.name, cookie.value, domain=cookie.domain, path=cookie.path)
+    client.cookies = jar
+    client.headers.update(session.headers)
+
+
+def build_async_client() -> httpx.AsyncClient:
+    """
+    Authenticated, pooled AsyncClient with HTTP/2 and keep-alive.
+    """
+    client = httpx.AsyncClient(
+        http2=True,
+        event_hooks={"request": [_acquire_token], "response": [_observe_response]},
+        timeout=httpx.Timeout(15.0, connect=5.0),
+        limits=httpx.Limits(
+            max_connections=settings.IG_MAX_IN_FLIGHT,
+            max_keepalive_connections=settings.IG_MAX_IN_FLIGHT,
+            keepalive_expiry=60,
+        ),
+    )
+    _sync_session(client, session_manager.get_session())
+    return client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Process-wide shared client, built on first use. Later calls pick up
+    session files that changed on disk, through the session manager.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = build_async_client()
+    elif session_manager.reload_if_changed():
+        _sync_session(_client, session_manager.get_session())
+    return _client
+
+
+async def close_async_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def gather_bounded(coros: Iterable[Awaitable[T]], limit: Optional[int] = None) -> List[T]:
+    """
+    Runs coroutines concurrently with at most `limit` in flight
+    (IG_MAX_IN_FLIGHT by default). Results keep input order.
+    """
+    semaphore = asyncio.Semaphore(limit or settings.IG_MAX_IN_FLIGHT)
+
+    async def run(coro: Awaitable[T]) -> T:
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run(coro) for coro in coros))
+
+
+async def _fetch_profile_webinfo_once(client: httpx.AsyncClient, username: str) -> Tuple[Optional[httpx.Response], str]:
+    try:
+        resp = await client.get(
+            "https://www.instagram.com/api/v1/users/web_profile_info/",
+            params={"username": username},
+            headers={
+                "Accept": "application/json",
+                "X-IG-App-ID": "936619743392459",
+                "Referer": f"https://www.instagram.com/{username}/",
+            },
+            timeout=httpx.Timeout(10.0, connect=5.0),
+        )
+    except httpx.TimeoutException:
+        return None, "timeout"
+    except httpx.TransportError:
+        return None, "connection_error"
+
+    if resp.status_code == 200:
+        return resp, "active"
+    return resp, classify_feed_status(resp.status_code) or "error"
+
+
+async def fetch_profile_webinfo(client: httpx.AsyncClient, username: str) -> dict:
+    """
+    GET /api/v1/users/web_profile_info/. Raises JobFailure on failure,
+    like profile_worker.fetch_profile_webinfo.
+    """
+    resp, status = await call_with_retry_async(
+        "web_profile_info",
+        lambda: _fetch_profile_webinfo_once(client, username),
+    )
+
+    if status != "active":
+        if resp is None:
+            raise JobFailure(f"IG webinfo failed status={status}", status)
+        raise JobFailure(
+            f"IG webinfo failed status={resp.status_code} body={resp.text[:200]}",
+            status,
+        )
+
+    payload = resp.json()
+    user = payload["data"]["user"]
+    archive_payload("web_profile_info", payload, username=username, ig_pk=user.get("id"))
+    return user
+
+
+async def fetch_profile_webinfos(usernames: List[str]) -> List[Union[dict, Exception]]:
+    """
+    fetch_profile_webinfo() for every username, at most IG_MAX_IN_FLIGHT at
+    once. Results keep input order; a failed fetch yields its exception.
+    """
+    client = get_async_client()
+
+    async def fetch(username: str) -> Union[dict, Exception]:
+        try:
+            return await fetch_profile_webinfo(client, username)
+        except Exception as e:
+            return e
+
+    return await gather_bounded(fetch(username) for username in usernames)
@@ -1,17 +1,112 @@
 import json
+import random
 import requests
+from http.cookiejar import Cookie
+from typing import Dict, Optional, Tuple
 from requests.cookies import RequestsCookieJar
 
+from src.app.core.logging_config import logger
+from src.app.instagram.rate_governor import governor, rate_controller
 
-def build_authenticated_session() -> requests.Session:
-    s = requests.Session()
 
-    with open("cookies.json", "r") as f:
+# User agents list for rotation (realistic browser headers)
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15",
+]
+
+# Request headers template for realistic browser behavior
+def get_browser_headers() -> Dict[str, str]:
+    """Generate realistic browser headers with rotated User-Agent."""
+    return {
+        "User-Agent": random.choice(USER_AGENTS),
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
+        "Accept-Language": "en-US,en;q=0.9",
+        "Accept-Encoding": "gzip, deflate, br",
+        "Connection": "keep-alive",
+        "Upgrade-Insecure-Requests": "1",
+        "Sec-Fetch-Dest": "document",
+        "Sec-Fetch-Mode": "navigate",
+        "Sec-Fetch-Site": "none",
+        "Cache-Control": "max-age=0",
+        "Referer": "https://www.instagram.com/",
+    }
+
+
+def load_session_files(
+    cookies_path: str = "cookies.json",
+    headers_path: str = "headers.json",
+) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Reads the exported login cookies and headers.
+    Shared by the blocking and the asyncio clients.
+    """
+    with open(cookies_path, "r") as f:
         cookies = json.load(f)
 
-    with open("headers.json", "r") as f:
+    with open(headers_path, "r") as f:
         headers = json.load(f)
 
+    return cookies, headers
+
+
+class GovernedSession(requests.Session):
+    """
+    requests.Session whose every request first takes a token from the
+    process-wide RequestGovernor and reports its status to the adaptive
+    rate controller. Callers never sleep for pacing themselves.
+
+    Also caches the csrftoken cookie, so headers do not walk the jar on
+    every request. The cache is dropped whenever a response sets a new
+    csrftoken; a 403 that mentions CSRF marks the token as rejected.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._csrf_cookie: Optional[Cookie] = None
+        self._csrf_cached = False
+        self.csrf_rejected = False
+
+    def request(self, method, url, *args, **kwargs):
+        governor.acquire()
+        response = super().request(method, url, *args, **kwargs)
+        rate_controller.observe(response.status_code, response.headers.get("Retry-After"))
+
+        if "csrftoken" in response.cookies:
+            self.invalidate_csrf()
+        elif response.status_code == 403 and "csrf" in response.text[:1000].lower():
+            logger.warning("CSRF token rejected by Instagram")
+            self.csrf_rejected = True
+
+        return response
+
+    def csrf_cookie(self) -> Optional[Cookie]:
+        if not self._csrf_cached:
+            # Several csrftoken cookies can exist for different domains/paths
+            self._csrf_cookie = next(
+                (cookie for cookie in self.cookies if cookie.name == "csrftoken"),
+                None,
+            )
+            self._csrf_cached = True
+        return self._csrf_cookie
+
+    def csrf_token(self) -> Optional[str]:
+        cookie = self.csrf_cookie()
+        return cookie.value if cookie else None
+
+    def invalidate_csrf(self) -> None:
+        self._csrf_cached = False
+        self.csrf_rejected = False
+
+
+def apply_session_files(s: requests.Session, cookies: Dict[str, str], headers: Dict[str, str]) -> None:
+    """
+    Replaces the session's login cookies and headers in place,
+    keeping its connection pool.
+    """
     jar = RequestsCookieJar()
     for name, value in cookies.items():
         jar.set(
@@ -24,4 +119,91 @@ def build_authenticated_session() -> requests.Session:
     s.cookies = jar
     s.headers.update(headers)
 
+    if isinstance(s, GovernedSession):
+        s.invalidate_csrf()
+
+
+def build_authenticated_session() -> requests.Session:
+    s = GovernedSession()
+
+    cookies, headers = load_session_files()
+    apply_session_files(s, cookies, headers)
+
     return s
+
+
+# ----------------------------------------------------------------------------
+# Transport-agnostic response handling, shared by the requests and httpx clients
+# so both classify responses identically.
+# ----------------------------------------------------------------------------
+
+def classify_feed_status(status_code: int) -> Optional[str]:
+    """
+    Classifies an HTTP status before the body is read.
+    Returns None when the body should be parsed.
+    """
+    if status_code in [401, 403]:
+        logger.warning(f"Authentication error ({status_code}). Session may be dead.")
+        return "session_dead"
+
+    if status_code == 429:
+        logger.warning("Rate limited (429). Too many requests.")
+        return "rate_limited"
+
+    if status_code >= 500:
+        return "server_error"
+
+    return None
+
+
+def classify_feed_payload(payload: dict) -> str:
+    """
+    Classifies a parsed JSON body: session_dead, error or active.
+    """
+    if payload.get("status") == "fail":
+        message = payload.get("message", "").lower()
+        if "login_required" in message or "checkpoint" in message:
+            logger.warning(f"Session issue: {message}")
+            return "session_dead"
+        logger.error(f"API Error: {payload.get('message')}")
+        return "error"
+
+    return "active"
+
+
+def parse_profile_id_a1(data: dict) -> Optional[str]:
+    """
+    Profile ID from a /{username}/?__a=1 payload.
+    """
+    profile_id = None
+    if "graphql" in data and "user" in data["graphql"]:
+        profile_id = data["graphql"]["user"].get("id")
+    elif "user" in data:
+        profile_id = data["user"].get("id")
+    return str(profile_id) if profile_id else None
+
+
+def parse_profile_id_graphql(data: dict) -> Optional[str]:
+    """
+    Profile ID from a GraphQL web_profile_info payload.
+    """
+    user = (data.get("data") or {}).get("user")
+    if user and user.get("id"):
+        return user["id"]
+
+    user = data.get("user")
+    if user and user.get("id"):
+        return user["id"]
+
+    return None
+
+
+def parse_profile_id_search(data: dict, username: str) -> Optional[str]:
+    """
+    Profile ID of the exact username match in a topsearch payload.
+    """
+    for user_wrapper in data.get("users", []):
+        user = user_wrapper.get("user")
+        if user and user.get("username") == username:
+            return str(user.get("pk"))
+    return None
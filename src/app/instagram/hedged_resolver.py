@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.app.core.logging_config import logger
+
+# (session, username) -> (profile_id, status), like the resolve_profile_id_* functions
+Strategy = Callable[..., Tuple[Optional[str], str]]
+
+
+class StrategyStats:
+    """
+    Rolling window of (latency, success) samples for one resolution strategy.
+    """
+
+    def __init__(self, name: str, window: int):
+        self.name = name
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, success: bool) -> None:
+        with self._lock:
+            self._samples.append((latency, success))
+
+    def success_rate(self) -> float:
+        with self._lock:
+            if not self._samples:
+                return 0.5  # neutral prior until we have observations
+            return sum(1 for _, ok in self._samples if ok) / len(self._samples)
+
+    def p95_latency(self) -> Optional[float]:
+        """
+        p95 of successful calls only: failures return fast and would
+        make the strategy look quicker than it is when it works.
+        """
+        with self._lock:
+            latencies = sorted(latency for latency, ok in self._samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            count = len(self._samples)
+        p95 = self.p95_latency()
+        return {
+            "samples": count,
+            "success_rate": round(self.success_rate(), 3),
+            "p95_latency": round(p95, 3) if p95 is not None else None,
+        }
+
+
+class HedgedResolver:
+    """
+    Runs profile-ID strategies as a hedged race instead of a strict cascade.
+
+    The strategy with the best recent success rate starts first. If it has
+    not answered within its hedge delay (rolling p95 latency scaled by its
+    success rate), the next strategy starts alongside it. The first valid ID
+    wins; strategies not yet started are cancelled. Requests already in
+    flight cannot be aborted, so they finish in the background and only
+    update the stats.
+    """
+
+    def __init__(
+        self,
+        strategies: List[Tuple[str, Strategy]],
+        window: int = 50,
+        min_delay: float = 0.5,
+        max_delay: float = 10.0,
+        default_delay: float = 3.0,
+    ):
+        self.strategies = strategies
+        self.stats = {name: StrategyStats(name, window) for name, _ in strategies}
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.default_delay = default_delay
+        self._executor = ThreadPoolExecutor(
+            max_workers=len(strategies),
+            thread_name_prefix="resolve",
+        )
+
+    def ordered_strategies(self) -> List[Tuple[str, Strategy]]:
+        # sorted() is stable: ties keep the configured order
+        return sorted(
+            self.strategies,
+            key=lambda strategy: self.stats[strategy[0]].success_rate(),
+            reverse=True,
+        )
+
+    def hedge_delay(self, name: str) -> float:
+        stats = self.stats[name]
+        p95 = stats.p95_latency()
+        if p95 is None:
+            return self.default_delay
+        # A strategy that rarely works does not deserve its full p95 head start
+        delay = p95 * max(stats.success_rate(), 0.1)
+        return min(self.max_delay, max(self.min_delay, delay))
+
+    def _timed(self, name: str, strategy: Strategy, session, username: str) -> Tuple[Optional[str], str]:
+        started_at = time.monotonic()
+        profile_id, status = None, "empty_data"
+        try:
+            profile_id, status = strategy(session, username)
+        finally:
+            self.stats[name].record(time.monotonic() - started_at, bool(profile_id))
+        return profile_id, status
+
+    def resolve(self, session, username: str) -> Tuple[Optional[str], str]:
+        queue = self.ordered_strategies()
+        running: Dict[Future, str] = {}
+        statuses: List[str] = []
+
+        def launch() -> float:
+            name, strategy = queue.pop(0)
+            running[self._executor.submit(self._timed, name, strategy, session, username)] = name
+            return self.hedge_delay(name)
+
+        delay = launch()
+        while running:
+            done, _ = wait(running, timeout=delay if queue else None, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name = running.pop(future)
+                try:
+                    profile_id, status = future.result()
+                except Exception as e:
+                    logger.error(f"Resolution strategy {name} failed: {e}")
+                    continue
+                if profile_id:
+                    for other in running:
+                        other.cancel()
+                    logger.info(f"Resolved profile_id via {name}: {profile_id}")
+                    return profile_id, "active"
+                statuses.append(status)
+
+            # Either the hedge delay ran out or a strategy failed: start the next one
+            if queue:
+                delay = launch()
+
+        if "session_dead" in statuses:
+            return None, "session_dead"
+        return None, "empty_data"
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {name: stats.snapshot() for name, stats in self.stats.items()}
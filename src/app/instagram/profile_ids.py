@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from src.app.core.config import settings
+from src.app.core.db.models import User
+
+
+class ProfileIdCache:
+    """
+    Thread-safe in-process LRU of username -> Instagram PK.
+    PKs never change, so entries never expire; size is the only bound.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, username: str) -> Optional[str]:
+        with self._lock:
+            ig_pk = self._data.get(username)
+            if ig_pk is not None:
+                self._data.move_to_end(username)
+            return ig_pk
+
+    def put(self, username: str, ig_pk: str) -> None:
+        with self._lock:
+            self._data[username] = ig_pk
+            self._data.move_to_end(username)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+profile_id_cache = ProfileIdCache(settings.IG_PK_CACHE_SIZE)
+
+
+def get_known_profile_id(db: Session, username: str) -> Optional[str]:
+    """
+    PK from the LRU, then from users.ig_pk. None means it must be resolved.
+    """
+    ig_pk = profile_id_cache.get(username)
+    if ig_pk:
+        return ig_pk
+
+    ig_pk = db.query(User.ig_pk).filter(User.username == username).scalar()
+    if ig_pk:
+        profile_id_cache.put(username, ig_pk)
+    return ig_pk
+
+
+def remember_profile_id(db: Session, username: str, ig_pk) -> None:
+    """
+    Stores a PK seen by any code path in the LRU and on users.ig_pk.
+    Does not commit: the caller's transaction carries the write.
+    """
+    if not ig_pk:
+        return
+    ig_pk = str(ig_pk)
+    profile_id_cache.put(username, ig_pk)
+    (
+        db.query(User)
+        .filter(User.username == username, User.ig_pk.is_distinct_from(ig_pk))
+        .update({User.ig_pk: ig_pk}, synchronize_session="fetch")
+    )
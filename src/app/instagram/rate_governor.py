@@ -0,0 +1,267 @@
+import asyncio
+import random
+import threading
+import time
+from datetime import datetime, UTC
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+from src.app.core.config import settings
+from src.app.core.logging_config import logger
+
+
+class RequestGovernor:
+    """
+    Process-wide token bucket for outbound Instagram requests.
+
+    Processes do not share it: each one holds its share of the deployment's
+    budget, IG_REQUESTS_PER_HOUR / IG_INSTANCES (see process_share()).
+
+    Tokens refill at requests_per_hour / 3600 per second up to `burst`.
+    Every request takes one token; when none is left the caller waits for
+    the next one plus a random jitter, so spacing stays irregular. This is
+    the only source of pacing: work done between requests (parsing, DB)
+    overlaps the wait instead of adding to it.
+    """
+
+    def __init__(self, requests_per_hour: float, burst: int = 1, jitter: float = 0.3):
+        self.burst = max(1, burst)
+        self.jitter = jitter
+        self._rate = requests_per_hour / 3600.0
+        self._tokens = float(self.burst)
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.total_requests = 0
+        self.total_wait_seconds = 0.0
+
+    @property
+    def requests_per_hour(self) -> float:
+        return self._rate * 3600.0
+
+    def set_rate(self, requests_per_hour: float) -> None:
+        with self._lock:
+            self._refill()
+            self._rate = max(requests_per_hour, 1.0) / 3600.0
+
+    def pause_for(self, seconds: float) -> None:
+        """
+        No token is handed out for the next `seconds` (e.g. Retry-After).
+        Overlapping pauses keep the later end.
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def paused_seconds(self) -> float:
+        return max(0.0, self._paused_until - time.monotonic())
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self._rate)
+        self._updated_at = now
+
+    def _time_to_token(self) -> float:
+        """
+        Seconds until one token is available. Caller holds the lock.
+        """
+        self._refill()
+        paused = self._paused_until - time.monotonic()
+        if paused > 0:
+            return paused
+        if self._tokens >= 1:
+            return 0.0
+        wait = (1 - self._tokens) / self._rate
+        return wait + random.uniform(0, self.jitter * wait)
+
+    def _try_take(self) -> float:
+        """
+        Takes a token if one is available (returns 0), else returns the wait.
+        """
+        with self._lock:
+            wait = self._time_to_token()
+            if wait == 0.0:
+                self._tokens -= 1
+                self.total_requests += 1
+            return wait
+
+    def acquire(self) -> float:
+        """
+        Blocks until a token is taken. Returns seconds waited.
+        """
+        started_at = time.monotonic()
+        while (wait := self._try_take()) > 0:
+            time.sleep(wait)
+        waited = time.monotonic() - started_at
+        self.total_wait_seconds += waited
+        return waited
+
+    async def acquire_async(self) -> float:
+        """
+        Same as acquire() but yields to the event loop while waiting.
+        """
+        started_at = time.monotonic()
+        while (wait := self._try_take()) > 0:
+            await asyncio.sleep(wait)
+        waited = time.monotonic() - started_at
+        self.total_wait_seconds += waited
+        return waited
+
+    def wait_available(self, stop_event: Optional[threading.Event] = None) -> bool:
+        """
+        Waits until a token is available without taking it, so the request
+        that follows goes out immediately. Returns False if stop_event fired.
+        """
+        while True:
+            with self._lock:
+                wait = self._time_to_token()
+            if wait == 0.0:
+                return True
+            if stop_event is None:
+                time.sleep(wait)
+            elif stop_event.wait(wait):
+                return False
+
+    def estimate_seconds(self, request_count: int) -> float:
+        """
+        Time needed to issue request_count more requests at the current rate.
+        """
+        with self._lock:
+            self._refill()
+            backlog = max(0.0, request_count - self._tokens)
+        return backlog / self._rate
+
+
+class AdaptiveRateController:
+    """
+    AIMD control of the governor's rate from observed responses.
+
+    429 and 5xx cut the rate multiplicatively (down to a floor) and pause the
+    governor: for Retry-After seconds when the header is present, otherwise
+    for a cooldown that doubles with each consecutive throttle. Every success
+    adds a small fixed amount back, up to the configured ceiling, so recovery
+    is slow and a throttling episode does not turn into a tight retry loop.
+    """
+
+    def __init__(
+        self,
+        governor: RequestGovernor,
+        ceiling_per_hour: float,
+        floor_per_hour: float,
+        decrease_factor: float = 0.5,
+        increase_per_success: float = 1.0,
+        base_cooldown: float = 60.0,
+        max_cooldown: float = 900.0,
+    ):
+        self.governor = governor
+        self.ceiling_per_hour = ceiling_per_hour
+        self.floor_per_hour = floor_per_hour
+        self.decrease_factor = decrease_factor
+        self.increase_per_success = increase_per_success
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+        self.consecutive_throttles = 0
+        self.throttle_events = 0
+        self.server_error_events = 0
+        self.last_throttled_at: Optional[datetime] = None
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """
+        Retry-After is either delta-seconds or an HTTP date.
+        """
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(UTC)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    def observe(self, status_code: int, retry_after: Optional[str] = None) -> None:
+        if status_code == 429 or status_code >= 500:
+            self._decrease(status_code, self.parse_retry_after(retry_after))
+        elif status_code < 400:
+            self._increase()
+
+    def _decrease(self, status_code: int, retry_after: Optional[float]) -> None:
+        with self._lock:
+            self.consecutive_throttles += 1
+            if status_code == 429:
+                self.throttle_events += 1
+            else:
+                self.server_error_events += 1
+            self.last_throttled_at = datetime.now(UTC)
+
+            new_rate = max(self.floor_per_hour, self.governor.requests_per_hour * self.decrease_factor)
+            self.governor.set_rate(new_rate)
+
+            if retry_after is None:
+                retry_after = min(
+                    self.max_cooldown,
+                    self.base_cooldown * 2 ** (self.consecutive_throttles - 1),
+                )
+            self.governor.pause_for(retry_after)
+
+        logger.warning(
+            "Instagram returned %s: rate lowered to %.0f/hour, paused %.0fs. State: %s",
+            status_code,
+            new_rate,
+            retry_after,
+            self.snapshot(),
+        )
+
+    def _increase(self) -> None:
+        with self._lock:
+            self.consecutive_throttles = 0
+            current = self.governor.requests_per_hour
+            if current < self.ceiling_per_hour:
+                self.governor.set_rate(min(self.ceiling_per_hour, current + self.increase_per_success))
+
+    def snapshot(self) -> Dict:
+        """
+        Controller state for logs and monitoring.
+        """
+        return {
+            "requests_per_hour": round(self.governor.requests_per_hour, 1),
+            "ceiling_per_hour": self.ceiling_per_hour,
+            "paused_seconds": round(self.governor.paused_seconds(), 1),
+            "consecutive_throttles": self.consecutive_throttles,
+            "throttle_events": self.throttle_events,
+            "server_error_events": self.server_error_events,
+            "last_throttled_at": self.last_throttled_at.isoformat() if self.last_throttled_at else None,
+            "total_requests": self.governor.total_requests,
+            "total_wait_seconds": round(self.governor.total_wait_seconds, 1),
+        }
+
+
+def process_share(requests_per_hour: float) -> float:
+    """
+    This process's part of a deployment-wide rate, split evenly over
+    IG_INSTANCES workers so N of them together stay within the budget.
+    """
+    return requests_per_hour / max(1, settings.IG_INSTANCES)
+
+
+governor = RequestGovernor(
+    requests_per_hour=process_share(settings.IG_REQUESTS_PER_HOUR),
+    burst=settings.IG_REQUEST_BURST,
+)
+
+rate_controller = AdaptiveRateController(
+    governor,
+    ceiling_per_hour=process_share(settings.IG_REQUESTS_PER_HOUR),
+    floor_per_hour=process_share(settings.IG_REQUESTS_PER_HOUR_FLOOR),
+    decrease_factor=settings.IG_RATE_DECREASE_FACTOR,
+    increase_per_success=settings.IG_RATE_RECOVERY_PER_SUCCESS,
+)
+
+logger.info(
+    "Instagram request governor: %.0f requests/hour in this process (%.0f/hour over %d instances), burst %d",
+    governor.requests_per_hour,
+    settings.IG_REQUESTS_PER_HOUR,
+    max(1, settings.IG_INSTANCES),
+    governor.burst,
+)
@@ -1,6 +1,8 @@
 from urllib.parse import urlparse
 import instaloader
 
+from src.app.instagram.rate_governor import governor
+
 # reuse a single Instaloader context per process
 _L = instaloader.Instaloader(
     download_pictures=False,
@@ -46,6 +48,8 @@ def resolve_username(entity_key: str) -> str | None:
             # -----------------------------
             if parts[0] in {"p", "reel", "tv"} and len(parts) >= 2:
                 shortcode = parts[1]
+                # Instaloader has its own session: take the token explicitly
+                governor.acquire()
                 post = instaloader.Post.from_shortcode(_L.context, shortcode)
                 return post.owner_username
     except Exception:
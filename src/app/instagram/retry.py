@@ -0,0 +1,209 @@
+import asyncio
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from src.app.core.config import settings
+from src.app.core.logging_config import logger
+
+# Outcomes worth another attempt: the endpoint, not the request, is at fault
+RETRYABLE_STATUSES = {"server_error", "timeout", "connection_error"}
+
+Attempt = Tuple[Optional[Any], str]
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Exponential backoff with jitter: the n-th wait is uniform in
+    [d/2, d] with d = min(max_delay, base_delay * 2**n).
+    """
+    max_attempts: int = 3
+    base_delay: float = 5.0
+    max_delay: float = 60.0
+
+    def backoff(self, attempt: int) -> float:
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return random.uniform(delay / 2, delay)
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint breaker. After `failure_threshold` consecutive retryable
+    failures it opens and calls fail fast for `reset_timeout` seconds, then
+    lets a single probe through (half-open) to decide whether to close again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+                return True
+            if self.state == "half_open":
+                # Only the probe already in flight may go through
+                return False
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != "closed":
+                logger.info(f"Circuit {self.name} closed")
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(f"Circuit {self.name} opened after {self.failures} failures")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class RetryStats:
+    """
+    Attempt counters per (endpoint, outcome).
+    """
+
+    def __init__(self):
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, outcome: str) -> None:
+        with self._lock:
+            self._counts[(endpoint, outcome)] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            result: Dict[str, Dict[str, int]] = {}
+            for (endpoint, outcome), count in self._counts.items():
+                result.setdefault(endpoint, {})[outcome] = count
+            return result
+
+
+default_policy = RetryPolicy(
+    max_attempts=settings.IG_RETRY_MAX_ATTEMPTS,
+    base_delay=settings.IG_RETRY_BASE_DELAY,
+    max_delay=settings.IG_RETRY_MAX_DELAY,
+)
+retry_stats = RetryStats()
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(endpoint: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if endpoint not in _breakers:
+            _breakers[endpoint] = CircuitBreaker(
+                endpoint,
+                failure_threshold=settings.IG_BREAKER_FAILURE_THRESHOLD,
+                reset_timeout=settings.IG_BREAKER_RESET_SECONDS,
+            )
+        return _breakers[endpoint]
+
+
+def breaker_states() -> Dict[str, str]:
+    with _breakers_lock:
+        return {name: breaker.state for name, breaker in _breakers.items()}
+
+
+def _settle(endpoint: str, breaker: CircuitBreaker, status: str) -> bool:
+    """
+    Books one attempt. Returns True if the status is worth retrying.
+    """
+    retry_stats.record(endpoint, status)
+    if status in RETRYABLE_STATUSES:
+        breaker.record_failure()
+        return True
+    if status != "rate_limited" or breaker.state == "half_open":
+        # The endpoint answered; throttling is the rate controller's business.
+        # A half-open probe must always be settled, or allow() stays False.
+        breaker.record_success()
+    return False
+
+
+def call_with_retry(
+    endpoint: str,
+    attempt: Callable[[], Attempt],
+    policy: Optional[RetryPolicy] = None,
+) -> Attempt:
+    """
+    Runs attempt() until it returns a non-retryable status or attempts run
+    out. attempt() returns (result, status) like fetch_posts_page. Returns
+    (None, "circuit_open") without a request while the endpoint's breaker is open.
+    """
+    policy = policy or default_policy
+    breaker = get_breaker(endpoint)
+    result, status = None, "circuit_open"
+
+    for n in range(policy.max_attempts):
+        if not breaker.allow():
+            retry_stats.record(endpoint, "circuit_open")
+            logger.warning(f"Circuit {endpoint} is open. Failing fast.")
+            return None, "circuit_open"
+
+        try:
+            result, status = attempt()
+        except Exception:
+            # A probe that raised still has to reopen the breaker
+            breaker.record_failure()
+            raise
+        if not _settle(endpoint, breaker, status):
+            return result, status
+
+        if n < policy.max_attempts - 1:
+            delay = policy.backoff(n)
+            logger.warning(f"{endpoint}: {status}, retrying in {delay:.1f}s ({n + 1}/{policy.max_attempts})")
+            time.sleep(delay)
+
+    return result, status
+
+
+async def call_with_retry_async(
+    endpoint: str,
+    attempt: Callable[[], Awaitable[Attempt]],
+    policy: Optional[RetryPolicy] = None,
+) -> Attempt:
+    """
+    asyncio version of call_with_retry: backoff waits free the event loop
+    for other users instead of holding a worker.
+    """
+    policy = policy or default_policy
+    breaker = get_breaker(endpoint)
+    result, status = None, "circuit_open"
+
+    for n in range(policy.max_attempts):
+        if not breaker.allow():
+            retry_stats.record(endpoint, "circuit_open")
+            logger.warning(f"Circuit {endpoint} is open. Failing fast.")
+            return None, "circuit_open"
+
+        try:
+            result, status = await attempt()
+        except Exception:
+            breaker.record_failure()
+            raise
+        if not _settle(endpoint, breaker, status):
+            return result, status
+
+        if n < policy.max_attempts - 1:
+            delay = policy.backoff(n)
+            logger.warning(f"{endpoint}: {status}, retrying in {delay:.1f}s ({n + 1}/{policy.max_attempts})")
+            await asyncio.sleep(delay)
+
+    return result, status
@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+from typing import Optional, Tuple
+
+from src.app.core.config import settings
+from src.app.core.logging_config import logger
+from src.app.instagram.client import (
+    GovernedSession,
+    apply_session_files,
+    get_browser_headers,
+    load_session_files,
+)
+
+
+class SessionManager:
+    """
+    Owns the process-wide authenticated requests session.
+
+    The session is built once and reused by every job. When cookies.json or
+    headers.json change on disk (a refreshed login), the new values are
+    loaded into the live session on the next access, without restarting
+    workers. The CSRF token is only refreshed when it is missing, was
+    rejected, or expires within the configured margin.
+    """
+
+    def __init__(self, cookies_path: str, headers_path: str, csrf_refresh_margin: float):
+        self.cookies_path = cookies_path
+        self.headers_path = headers_path
+        self.csrf_refresh_margin = csrf_refresh_margin
+        self._session: Optional[GovernedSession] = None
+        self._mtimes: Optional[Tuple[float, float]] = None
+        self._lock = threading.Lock()
+
+    def _file_mtimes(self) -> Tuple[float, float]:
+        return os.stat(self.cookies_path).st_mtime, os.stat(self.headers_path).st_mtime
+
+    def _load(self, session: GovernedSession) -> None:
+        mtimes = self._file_mtimes()
+        cookies, headers = load_session_files(self.cookies_path, self.headers_path)
+        apply_session_files(session, cookies, headers)
+        self._mtimes = mtimes
+
+    def get_session(self) -> GovernedSession:
+        with self._lock:
+            if self._session is None:
+                session = GovernedSession()
+                self._load(session)
+                self._session = session
+                logger.info("Authenticated Instagram session built")
+            else:
+                self._reload_if_changed()
+            return self._session
+
+    def _reload_if_changed(self) -> bool:
+        """
+        Caller holds the lock.
+        """
+        try:
+            if self._file_mtimes() == self._mtimes:
+                return False
+            self._load(self._session)
+        except (OSError, ValueError) as e:
+            # Half-written file during a login refresh: keep the current cookies
+            logger.warning(f"Session files changed but could not be loaded: {e}")
+            return False
+        logger.info("Session files changed on disk. Cookies and headers reloaded.")
+        return True
+
+    def reload_if_changed(self) -> bool:
+        with self._lock:
+            if self._session is None:
+                return False
+            return self._reload_if_changed()
+
+    def csrf_needs_refresh(self, session: GovernedSession) -> bool:
+        cookie = session.csrf_cookie()
+        if cookie is None or session.csrf_rejected:
+            return True
+        # Tokens from cookies.json carry no expiry; ones set by Instagram do
+        return cookie.expires is not None and cookie.expires - time.time() < self.csrf_refresh_margin
+
+    def ensure_fresh_csrf(self, session: GovernedSession) -> bool:
+        """
+        Picks up new session files, then refreshes the CSRF token only if needed.
+        """
+        self.reload_if_changed()
+        if not self.csrf_needs_refresh(session):
+            return True
+        return self.refresh_csrf(session)
+
+    def refresh_csrf(self, session: GovernedSession) -> bool:
+        """
+        Refresh CSRF token by visiting the main Instagram page.
+        Returns True if successful, False otherwise.
+        """
+        try:
+            logger.info("Attempting to refresh CSRF token...")
+            response = session.get("https://www.instagram.com/", headers=get_browser_headers(), timeout=10)
+
+            if response.status_code != 200:
+                logger.warning(f"Failed to refresh CSRF token (status: {response.status_code})")
+                return False
+
+            session.invalidate_csrf()
+            if session.csrf_token():
+                logger.info("CSRF token refreshed successfully")
+                return True
+
+            logger.warning("CSRF token not found after refresh attempt")
+            return False
+
+        except Exception as e:
+            logger.error(f"Exception during CSRF token refresh: {e}")
+            return False
+
+
+session_manager = SessionManager(
+    cookies_path="cookies.json",
+    headers_path="headers.json",
+    csrf_refresh_margin=settings.IG_CSRF_REFRESH_MARGIN,
+)
+
+
+def get_session() -> GovernedSession:
+    """
+    Process-wide authenticated session; hot-reloads the cookie files.
+    """
+    return session_manager.get_session()
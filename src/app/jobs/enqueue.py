@@ -1,27 +1,111 @@
-from sqlalchemy.exc import IntegrityError
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
 from src.app.core.db.models import ScrapeJob, ScrapeJobType, ScrapeJobSource
-from src.app.core.db.session import SessionLocal
 from src.app.core.db.models import ScrapeJobStatus
+from src.app.core.logging_config import logger
+from src.app.jobs.notify import notify_stage
+from src.app.jobs.queue import POST_STAGE, stages_ready_at
+from src.app.services.url_canonical import canonical_shortcodes
+
+# Rows per INSERT statement; keeps bind parameters well under Postgres' 65535
+ENQUEUE_CHUNK_SIZE = 1000
+
+
+@dataclass
+class EnqueueResult:
+    inserted: int = 0
+    duplicates: int = 0
+    job_ids: list[int] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        return f"{self.inserted} inserted, {self.duplicates} duplicates"
+
+
+def enqueue_jobs(
+    db: Session,
+    job_type: ScrapeJobType,
+    entity_keys: Iterable[str],
+    source: ScrapeJobSource,
+    chunk_size: int = ENQUEUE_CHUNK_SIZE,
+    status: ScrapeJobStatus = ScrapeJobStatus.PENDING,
+) -> EnqueueResult:
+    """
+    Inserts jobs (PENDING by default) idempotently, one INSERT ... ON CONFLICT
+    (job_type, entity_key) DO NOTHING RETURNING id per chunk. Keys that
+    already have a job, or repeat within the input, count as duplicates.
+
+    Does not commit: the jobs and the NOTIFY waking the stage's workers
+    land with the caller's commit, or not at all.
+    """
+    keys = list(entity_keys)
+    unique_keys = list(dict.fromkeys(keys))
+    result = EnqueueResult()
+
+    for start in range(0, len(unique_keys), chunk_size):
+        chunk = unique_keys[start:start + chunk_size]
+        stmt = (
+            pg_insert(ScrapeJob)
+            .values([
+                {
+                    "job_type": job_type,
+                    "entity_key": key,
+                    "source": source,
+                    "status": status,
+                }
+                for key in chunk
+            ])
+            .on_conflict_do_nothing(index_elements=["job_type", "entity_key"])
+            .returning(ScrapeJob.id)
+        )
+        result.job_ids.extend(db.execute(stmt).scalars().all())
+
+    result.inserted = len(result.job_ids)
+    result.duplicates = len(keys) - result.inserted
+
+    if result.inserted:
+        for stage in stages_ready_at(job_type, status):
+            notify_stage(db, stage.name)
+
+    return result
+
 
 def enqueue_post_jobs(
-    urls: set[str],
+    urls: Iterable[str],
     source: ScrapeJobSource,
-    db: SessionLocal,
-) -> None:
+    db: Session,
+) -> EnqueueResult:
     """
     Inserts POST jobs idempotently.
-    One URL = one job.
+    One post = one job, keyed on its shortcode whatever form the URL had.
     """
+    shortcodes, rejected = canonical_shortcodes(urls)
+    if rejected:
+        logger.info(f"Skipped {len(rejected)} URLs that are not Instagram posts: {rejected[:5]}")
 
-    for url in urls:
-        job = ScrapeJob(
-            job_type=ScrapeJobType.POST,
-            entity_key=url,
-            source=source,
-            status=ScrapeJobStatus.PENDING,
-        )
-        try:
-            db.add(job)
-            db.commit()
-        except IntegrityError:
-            db.rollback()  # duplicate → expected
+    result = enqueue_jobs(db, ScrapeJobType.POST, shortcodes, source)
+    db.commit()
+
+    logger.info(f"Enqueued POST jobs: {result}")
+    return result
+
+
+def enqueue_resolved_posts(
+    owners: dict[str, str],
+    source: ScrapeJobSource,
+    db: Session,
+) -> tuple[EnqueueResult, EnqueueResult]:
+    """
+    Posts whose owner is already known (from search metadata): the POST job
+    is recorded as done, so the post worker never looks it up, and the
+    owner's PROFILE job is enqueued directly. Returns (posts, profiles).
+    """
+    posts = enqueue_jobs(db, ScrapeJobType.POST, owners.keys(), source, status=POST_STAGE.done)
+    profiles = enqueue_jobs(db, ScrapeJobType.PROFILE, owners.values(), source)
+    db.commit()
+
+    logger.info(f"Recorded resolved POST jobs: {posts}; enqueued PROFILE jobs: {profiles}")
+    return posts, profiles
@@ -0,0 +1,85 @@
+"""
+Postgres LISTEN/NOTIFY wake-ups for the job queue.
+
+Whatever makes a job claimable (an enqueue, or a job moving into the next
+stage's ready status) sends NOTIFY on that stage's channel in the same
+transaction. Postgres delivers it only on commit and merges duplicates, so
+a bulk enqueue sends one wake-up. Idle workers block in JobListener.wait()
+instead of polling, and keep a slow fallback poll for anything that became
+claimable without a notification (expired leases, due retries).
+"""
+
+import select
+import time
+
+from sqlalchemy import func
+from sqlalchemy import select as sql_select
+from sqlalchemy.orm import Session
+
+from src.app.core.db.session import engine
+from src.app.core.logging_config import logger
+
+
+def channel_for(stage_name: str) -> str:
+    return f"scrape_jobs_{stage_name}"
+
+
+def notify_stage(db: Session, stage_name: str) -> None:
+    """
+    Queues a wake-up for a stage's workers. Sent when db commits.
+    """
+    db.execute(sql_select(func.pg_notify(channel_for(stage_name), "")))
+
+
+class JobListener:
+    """
+    Dedicated autocommit connection that LISTENs on stage channels.
+    """
+
+    def __init__(self, *stage_names: str):
+        self.channels = [channel_for(name) for name in stage_names]
+        self._conn = None
+
+    def _connect(self) -> None:
+        raw = engine.raw_connection()
+        # Taken out of the pool for good: it stays in autocommit and LISTENing
+        raw.detach()
+        conn = raw.driver_connection
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            for channel in self.channels:
+                cursor.execute(f'LISTEN "{channel}"')
+        self._conn = conn
+        logger.info(f"Listening for jobs on {', '.join(self.channels)}")
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Blocks until a notification arrives or timeout seconds pass.
+        Returns True if woken by a notification. Connection problems
+        degrade to a plain sleep so the caller's fallback poll still runs.
+        """
+        try:
+            if self._conn is None:
+                self._connect()
+            if not self._conn.notifies:
+                ready, _, _ = select.select([self._conn], [], [], timeout)
+                if not ready:
+                    return False
+                self._conn.poll()
+            woken = bool(self._conn.notifies)
+            # One wake-up is enough: the worker drains the queue after it
+            self._conn.notifies.clear()
+            return woken
+        except Exception as e:
+            logger.warning(f"Job listener failed, falling back to polling: {e}")
+            self.close()
+            time.sleep(timeout)
+            return False
+
+    def close(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
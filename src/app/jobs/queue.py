@@ -0,0 +1,469 @@
+"""
+Lease-based job queue over scrape_jobs.
+
+Every worker stage moves a job from a ready status to a running status and
+then to a done or failed status. Claiming is atomic (FOR UPDATE SKIP
+LOCKED), so any number of processes can serve the same stage. A claim
+writes the worker's identity and a lease expiry, and a heartbeat thread
+extends the lease while the job runs. If a worker dies, its lease runs out
+and reap_expired_leases() puts the job back in the stage's ready status.
+
+Failures go through fail_jobs(): the job returns to ready with a
+retry_after that backs off exponentially per failure class, and claims
+skip it until it is due. After JOB_MAX_ATTEMPTS it moves to DEAD.
+"""
+
+import os
+import socket
+import threading
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from sqlalchemy import case, func, literal, or_, select, update
+from sqlalchemy.orm import Session
+
+from src.app.core.config import settings
+from src.app.core.db.models import ScrapeJob, ScrapeJobStatus, ScrapeJobType
+from src.app.core.db.session import SessionLocal
+from src.app.core.logging_config import logger
+from src.app.jobs.notify import notify_stage
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    job_type: ScrapeJobType
+    ready: ScrapeJobStatus
+    running: ScrapeJobStatus
+    done: ScrapeJobStatus
+    failed: ScrapeJobStatus
+    # Failed jobs that left a pagination checkpoint go back to ready on requeue_checkpointed()
+    resume_checkpointed: bool = False
+
+
+# post URL -> username (worker.py)
+POST_STAGE = Stage(
+    name="post",
+    job_type=ScrapeJobType.POST,
+    ready=ScrapeJobStatus.PENDING,
+    running=ScrapeJobStatus.USER_CREATION_RUNNING,
+    done=ScrapeJobStatus.USER_CREATED,
+    failed=ScrapeJobStatus.USER_CREATION_FAILED,
+)
+
+# username -> profile (profile_worker.py)
+PROFILE_STAGE = Stage(
+    name="profile",
+    job_type=ScrapeJobType.PROFILE,
+    ready=ScrapeJobStatus.PENDING,
+    running=ScrapeJobStatus.USER_SEED_RUNNING,
+    done=ScrapeJobStatus.USER_SEEDED,
+    failed=ScrapeJobStatus.USER_SEEDED_FAILED,
+)
+
+# profile -> posts (post_seed_worker.py)
+POSTS_STAGE = Stage(
+    name="posts",
+    job_type=ScrapeJobType.PROFILE,
+    ready=ScrapeJobStatus.USER_SEEDED,
+    running=ScrapeJobStatus.POSTS_SEED_RUNNING,
+    done=ScrapeJobStatus.POSTS_SEEDED,
+    failed=ScrapeJobStatus.POSTS_SEEDED_FAILED,
+    resume_checkpointed=True,
+)
+
+STAGES = (POST_STAGE, PROFILE_STAGE, POSTS_STAGE)
+
+
+def stages_ready_at(job_type: ScrapeJobType, status: ScrapeJobStatus) -> list:
+    """
+    Stages for which a job of this type and status is claimable.
+    """
+    return [stage for stage in STAGES if stage.job_type == job_type and stage.ready == status]
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claimable(stage: Stage):
+    """
+    SELECT of the next claimable job ids for a stage, in claim order:
+    ready and, if a retry was scheduled, due.
+    """
+    return (
+        select(ScrapeJob.id)
+        .where(
+            ScrapeJob.job_type == stage.job_type,
+            ScrapeJob.status == stage.ready,
+            # Scheduled retries wait until they are due
+            or_(ScrapeJob.retry_after.is_(None), ScrapeJob.retry_after <= func.now()),
+        )
+        .order_by(ScrapeJob.created_at, ScrapeJob.id)
+    )
+
+
+def claim_batch(
+    db: Session,
+    stage: Stage,
+    k: int,
+    lease_seconds: Optional[float] = None,
+) -> List[ScrapeJob]:
+    """
+    Atomically leases up to k of the oldest claimable jobs of a stage with a
+    single WITH picked AS (SELECT ... FOR UPDATE SKIP LOCKED) UPDATE ...
+    RETURNING, moving them to the stage's running status. Rows locked by
+    other workers are skipped, not waited on. Returns [] when nothing is
+    claimable, otherwise the claimed jobs in claim order.
+    """
+    lease_seconds = lease_seconds or settings.JOB_LEASE_SECONDS
+    # MATERIALIZED: the locking SELECT must run exactly once, or a re-scanned
+    # subquery could lock (and claim) more than k rows
+    picked = (
+        claimable(stage)
+        .limit(k)
+        .with_for_update(skip_locked=True)
+        .cte("picked")
+        .prefix_with("MATERIALIZED")
+    )
+    job_ids = db.execute(
+        update(ScrapeJob)
+        .where(ScrapeJob.id == picked.c.id)
+        .values(
+            status=stage.running,
+            claimed_by=worker_id(),
+            lease_expires_at=func.now() + timedelta(seconds=lease_seconds),
+        )
+        .returning(ScrapeJob.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    db.commit()
+    if not job_ids:
+        return []
+
+    # One read after the commit, instead of a lazy reload per expired object
+    return (
+        db.query(ScrapeJob)
+        .filter(ScrapeJob.id.in_(job_ids))
+        .order_by(ScrapeJob.created_at, ScrapeJob.id)
+        .populate_existing()
+        .all()
+    )
+
+
+def claim_next(db: Session, stage: Stage, lease_seconds: Optional[float] = None) -> Optional[ScrapeJob]:
+    """
+    claim_batch() of one job. Returns None when nothing is claimable.
+    """
+    jobs = claim_batch(db, stage, 1, lease_seconds)
+    return jobs[0] if jobs else None
+
+
+def extend_leases(job_ids: Iterable[int], lease_seconds: Optional[float] = None) -> Set[int]:
+    """
+    Pushes the lease of jobs we hold forward. Runs in its own DB session so
+    it never commits the worker's half-done transaction. Returns the ids
+    still held; any other id lost its lease (reaped, maybe reclaimed).
+    """
+    lease_seconds = lease_seconds or settings.JOB_LEASE_SECONDS
+    db = SessionLocal()
+    try:
+        held = db.execute(
+            update(ScrapeJob)
+            .where(ScrapeJob.id.in_(list(job_ids)), ScrapeJob.claimed_by == worker_id())
+            .values(lease_expires_at=func.now() + timedelta(seconds=lease_seconds))
+            .returning(ScrapeJob.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+        db.commit()
+        return set(held)
+    finally:
+        db.close()
+
+
+class LeaseHeartbeat:
+    """
+    Context manager that keeps the leases of claimed jobs alive from a
+    background thread for as long as the worker is processing them.
+
+        with LeaseHeartbeat([job.id for job in jobs]):
+            process(jobs)
+    """
+
+    def __init__(
+        self,
+        job_ids: Union[int, Iterable[int]],
+        interval: Optional[float] = None,
+        lease_seconds: Optional[float] = None,
+    ):
+        self.job_ids = {job_ids} if isinstance(job_ids, int) else set(job_ids)
+        self.interval = interval or settings.JOB_HEARTBEAT_SECONDS
+        self.lease_seconds = lease_seconds or settings.JOB_LEASE_SECONDS
+        self.lost: Set[int] = set()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"lease-{min(self.job_ids, default=0)}", daemon=True)
+
+    def _run(self) -> None:
+        while self.job_ids and not self._stop.wait(self.interval):
+            try:
+                held = extend_leases(self.job_ids, self.lease_seconds)
+            except Exception as e:
+                # A missed beat is fine as long as the next one lands before expiry
+                logger.warning(f"Lease heartbeat for jobs {sorted(self.job_ids)} failed: {e}")
+                continue
+            lost = self.job_ids - held
+            if lost:
+                logger.warning(f"Lost the lease on jobs {sorted(lost)}; another worker may pick them up")
+                self.lost |= lost
+                self.job_ids = held
+
+    def __enter__(self) -> "LeaseHeartbeat":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+
+# (job, new status or None to keep the one already written, error message or None)
+Outcome = Tuple[ScrapeJob, Optional[ScrapeJobStatus], Optional[str]]
+
+
+def finish_jobs(db: Session, outcomes: Iterable[Outcome]) -> int:
+    """
+    Releases our leases and records outcomes in bulk: one UPDATE per
+    distinct (status, error) instead of one per job, in one transaction.
+    Jobs whose lease was lost in the meantime are left untouched.
+    A job that reaches a stage's done status starts the next stage with a
+    clean retry count: PROFILE_STAGE and POSTS_STAGE share the row.
+    Returns the number of jobs finished.
+    """
+    done_statuses = [stage.done for stage in STAGES]
+    groups: Dict[Tuple, List[ScrapeJob]] = {}
+    for job, status, error in outcomes:
+        key = (job.job_type, status, error[:500] if error is not None else None)
+        groups.setdefault(key, []).append(job)
+
+    finished = 0
+    for (job_type, status, error), jobs in groups.items():
+        values = {"claimed_by": None, "lease_expires_at": None}
+        if status is None:
+            # Status already written by the job code: reset if that is a done status
+            reached_done = ScrapeJob.status.in_(done_statuses)
+            values["attempts"] = case((reached_done, 0), else_=ScrapeJob.attempts)
+            values["retry_after"] = case((reached_done, None), else_=ScrapeJob.retry_after)
+        else:
+            values["status"] = status
+            if status in done_statuses:
+                values.update(attempts=0, retry_after=None)
+        if error is not None:
+            values["last_error"] = error
+
+        ids = [job.id for job in jobs]
+        done_ids = set(db.execute(
+            update(ScrapeJob)
+            .where(ScrapeJob.id.in_(ids), ScrapeJob.claimed_by == worker_id())
+            .values(**values)
+            .returning(ScrapeJob.id)
+            .execution_options(synchronize_session=False)
+        ).scalars())
+
+        lost = set(ids) - done_ids
+        if lost:
+            logger.warning(f"Jobs {sorted(lost)} were no longer leased by {worker_id()}; outcome not recorded")
+        if status is not None and done_ids:
+            # e.g. USER_SEEDED hands the jobs to the posts stage
+            for stage in stages_ready_at(job_type, status):
+                notify_stage(db, stage.name)
+        finished += len(done_ids)
+
+    db.commit()
+    for jobs in groups.values():
+        for job in jobs:
+            db.expire(job)
+    return finished
+
+
+def finish_job(
+    db: Session,
+    job: ScrapeJob,
+    status: Optional[ScrapeJobStatus] = None,
+    error: Optional[str] = None,
+) -> bool:
+    """
+    Releases our lease on a job and optionally sets its outcome. status=None
+    keeps whatever status the job code already wrote. Returns False, and
+    changes nothing, if the lease was lost in the meantime.
+    """
+    return finish_jobs(db, [(job, status, error)]) == 1
+
+
+class JobFailure(RuntimeError):
+    """
+    A job failure with the client status that caused it (session_dead,
+    rate_limited, timeout, ...), so the retry schedule never depends on the
+    wording of the message or a response body quoted in it.
+    """
+
+    def __init__(self, message: str, status: str):
+        super().__init__(message)
+        self.status = status
+
+
+# Client status -> failure class; any other status is a plain "error"
+STATUS_FAILURE_CLASSES = {
+    "session_dead": "session_dead",
+    "rate_limited": "rate_limited",
+    "server_error": "transient",
+    "timeout": "transient",
+    "connection_error": "transient",
+    "circuit_open": "transient",
+}
+
+
+def classify_failure(exc: BaseException) -> str:
+    """
+    Failure class of a job exception, for retry scheduling:
+    session_dead, rate_limited, transient or error.
+    """
+    if isinstance(exc, JobFailure):
+        return STATUS_FAILURE_CLASSES.get(exc.status, "error")
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return "transient"
+    return "error"
+
+
+def _retry_base_seconds(failure_class: str) -> float:
+    return {
+        "rate_limited": settings.JOB_RETRY_RATE_LIMITED_SECONDS,
+        "transient": settings.JOB_RETRY_TRANSIENT_SECONDS,
+    }.get(failure_class, settings.JOB_RETRY_ERROR_SECONDS)
+
+
+def fail_jobs(db: Session, stage: Stage, failures: Iterable[Tuple[ScrapeJob, str, str]]) -> int:
+    """
+    Schedules retries for failed jobs we hold and releases their leases.
+
+    Each job goes back to the stage's ready status with attempts + 1 and
+    retry_after = now + base * 2**attempts (uniform in [d/2, d], capped),
+    where base depends on the failure class (see classify_failure()) given
+    with each (job, error, failure_class). A job at JOB_MAX_ATTEMPTS moves
+    to DEAD instead. A dead session is not the job's fault: the job is
+    requeued without spending an attempt, but only after
+    JOB_RETRY_SESSION_DEAD_SECONDS, so it is not reclaimed in a tight loop
+    while the login is being fixed.
+    Everything is computed in SQL from the row's own attempts: one UPDATE
+    per distinct error. Returns the number of jobs moved to DEAD.
+    """
+    groups: Dict[Tuple[str, str], List[ScrapeJob]] = {}
+    for job, error, failure_class in failures:
+        groups.setdefault((error[:500], failure_class), []).append(job)
+
+    dead = 0
+    for (error, failure_class), jobs in groups.items():
+        values = {"claimed_by": None, "lease_expires_at": None, "last_error": error}
+
+        if failure_class == "session_dead":
+            values.update(
+                status=stage.ready,
+                retry_after=func.now() + timedelta(seconds=settings.JOB_RETRY_SESSION_DEAD_SECONDS),
+            )
+        else:
+            delay = func.least(
+                settings.JOB_RETRY_MAX_SECONDS,
+                _retry_base_seconds(failure_class) * func.power(2, ScrapeJob.attempts),
+            ) * (0.5 + func.random() / 2)
+            values.update(
+                attempts=ScrapeJob.attempts + 1,
+                retry_after=func.now() + func.make_interval(0, 0, 0, 0, 0, 0, delay),
+                status=case(
+                    (
+                        ScrapeJob.attempts + 1 >= settings.JOB_MAX_ATTEMPTS,
+                        literal(ScrapeJobStatus.DEAD, ScrapeJob.status.type),
+                    ),
+                    else_=literal(stage.ready, ScrapeJob.status.type),
+                ),
+            )
+
+        rows = db.execute(
+            update(ScrapeJob)
+            .where(ScrapeJob.id.in_([job.id for job in jobs]), ScrapeJob.claimed_by == worker_id())
+            .values(**values)
+            .returning(ScrapeJob.id, ScrapeJob.status, ScrapeJob.attempts, ScrapeJob.retry_after)
+            .execution_options(synchronize_session=False)
+        ).all()
+
+        for row in rows:
+            if row.status == ScrapeJobStatus.DEAD:
+                dead += 1
+                logger.warning(f"Job {row.id} is DEAD after {row.attempts} attempts: {error}")
+            else:
+                logger.info(f"Job {row.id} ({failure_class}) retries after {row.retry_after}, attempt {row.attempts}")
+        if len(rows) < len(jobs):
+            logger.warning(f"{len(jobs) - len(rows)} failed jobs were no longer leased by {worker_id()}")
+
+    db.commit()
+    for jobs in groups.values():
+        for job in jobs:
+            db.expire(job)
+    return dead
+
+
+def fail_job(db: Session, stage: Stage, job: ScrapeJob, exc: BaseException) -> bool:
+    """
+    fail_jobs() for one job failed with exc. Returns True if it was moved to DEAD.
+    """
+    return fail_jobs(db, stage, [(job, str(exc), classify_failure(exc))]) == 1
+
+
+def reap_expired_leases(db: Session) -> int:
+    """
+    Returns jobs whose lease expired in a *_RUNNING status (crashed or hung
+    worker) to their stage's ready status. Pagination checkpoints are kept,
+    so a reaped post seed resumes where it stopped. Returns jobs reaped.
+    """
+    reaped = 0
+    for stage in STAGES:
+        result = db.execute(
+            update(ScrapeJob)
+            .where(
+                ScrapeJob.job_type == stage.job_type,
+                ScrapeJob.status == stage.running,
+                ScrapeJob.lease_expires_at < func.now(),
+            )
+            .values(status=stage.ready, claimed_by=None, lease_expires_at=None)
+        )
+        if result.rowcount:
+            logger.warning(f"Reaped {result.rowcount} expired {stage.name} jobs back to {stage.ready.name}")
+            notify_stage(db, stage.name)
+        reaped += result.rowcount
+    db.commit()
+    return reaped
+
+
+def requeue_checkpointed(db: Session, stage: Stage) -> int:
+    """
+    Puts failed jobs that left a pagination checkpoint back in the ready
+    status, so they resume from the checkpoint. Called once when a worker
+    starts: a job that fails again stays failed until the next start
+    instead of being reclaimed in a loop. Returns jobs requeued.
+    """
+    if not stage.resume_checkpointed:
+        return 0
+    result = db.execute(
+        update(ScrapeJob)
+        .where(
+            ScrapeJob.job_type == stage.job_type,
+            ScrapeJob.status == stage.failed,
+            ScrapeJob.checkpoint_cursor.isnot(None),
+        )
+        .values(status=stage.ready)
+    )
+    if result.rowcount:
+        notify_stage(db, stage.name)
+    db.commit()
+    if result.rowcount:
+        logger.info(f"Requeued {result.rowcount} checkpointed {stage.name} jobs")
+    return result.rowcount
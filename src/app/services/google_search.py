@@ -1,62 +1,153 @@
 import requests
-from typing import List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from requests.adapters import HTTPAdapter
 from src.app.core.config import settings
 from src.app.core.logging_config import logger
+from src.app.services.search_cache import SearchCache
+from src.app.services.search_yield import YieldTracker
+from src.app.services.url_canonical import canonical_shortcode
+
+GOOGLE_SEARCH_URL = "https://www.googleapis.com/customsearch/v1"
+PAGE_SIZE = 10  # Custom Search API maximum per request
+
+# One keep-alive pool for every search thread; the semaphore bounds
+# requests in flight across all concurrent callers
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=settings.GOOGLE_SEARCH_MAX_IN_FLIGHT))
+_in_flight = threading.BoundedSemaphore(settings.GOOGLE_SEARCH_MAX_IN_FLIGHT)
+
+search_cache: Optional[SearchCache] = (
+    SearchCache(settings.GOOGLE_SEARCH_CACHE_PATH, settings.GOOGLE_SEARCH_CACHE_TTL_SECONDS)
+    if settings.GOOGLE_SEARCH_CACHE_ENABLED
+    else None
+)
+
+
+def _search_query(query: str) -> str:
+    return f'site:instagram.com (inurl:/p/ OR inurl:/reel/) {query}'
+
+
+def fetch_search_page(query: str, start: int) -> Tuple[Optional[List[dict]], bool]:
+    """
+    Result items of one page (start is 1-based), from the cache when fresh,
+    and whether they came from the cache. Items are None if the request failed.
+    """
+    q = _search_query(query)
+    if search_cache:
+        cached = search_cache.get(q, start)
+        if cached is not None:
+            return cached, True
+
+    params = {
+        "key": settings.GOOGLE_API_KEY,
+        "cx": settings.GOOGLE_CSE_ID,
+        "q": q,
+        "start": start,
+        "num": PAGE_SIZE,
+    }
+
+    try:
+        with _in_flight:
+            resp = _session.get(GOOGLE_SEARCH_URL, params=params, timeout=10)
+        resp.raise_for_status()
+    except requests.RequestException as e:
+        logger.warning(f"Google API request failed at start={start}: {e}")
+        return None, False
+
+    items = resp.json().get("items", [])
+    if search_cache:
+        search_cache.put(q, start, items)
+    return items, False
 
 
 def google_search_instagram_posts(query: str, limit: int = 30) -> List[str]:
+    """
+    Post URLs of google_search_instagram_items(), query strings stripped.
+    """
+    return [item["link"].split("?")[0] for item in google_search_instagram_items(query, limit)]
+
+
+def google_search_instagram_items(
+    query: str,
+    limit: int = 30,
+    tracker: Optional[YieldTracker] = None,
+) -> List[dict]:
     """
     Pagination-based Google search. Gets up to 100 results (API max is 100).
+    Returns the raw result items for post links, with their title, snippet
+    and pagemap metadata.
+
+    With a tracker, paging is adaptive: it stops once a page's share of new
+    shortcodes falls below GOOGLE_SEARCH_MIN_PAGE_YIELD.
     """
-    
+
     api_key = settings.GOOGLE_API_KEY
     cse_id = settings.GOOGLE_CSE_ID
 
     if not api_key or not cse_id:
         raise RuntimeError("Google Search API not configured")
 
-    urls: list[str] = []
+    results: list[dict] = []
     limit = min(limit, 100)  # Google API max is 100
-    
-    calls_needed = (limit + 9) // 10
-    
+
+    calls_needed = (limit + PAGE_SIZE - 1) // PAGE_SIZE
+
     for page in range(calls_needed):
-        start_index = (page * 10) + 1
-        
-        params = {
-            "key": api_key,
-            "cx": cse_id,
-            "q": f'site:instagram.com (inurl:/p/ OR inurl:/reel/) {query}',
-            "start": start_index,
-            "num": 10,
-        }
-
-        try:
-            resp = requests.get(
-                "https://www.googleapis.com/customsearch/v1",
-                params=params,
-                timeout=10,
-            )
-            resp.raise_for_status()
-        except requests.RequestException as e:
-            logger.warning(f"Google API request failed at page {page}: {e}")
-            break
-        
-        data = resp.json()
-        items = data.get("items", [])
-        
+        items, cached = fetch_search_page(query, page * PAGE_SIZE + 1)
+
         if not items:
             break
-        
+
+        page_yield = tracker.record_page(query, items, cached) if tracker else 1.0
+
         for item in items:
-            link = item.get("link")
-            if link and ("/p/" in link or "/reel/" in link):
-                clean_url = link.split("?")[0]
-                urls.append(clean_url)
-                
-                if len(urls) >= limit:
-                    logger.info(f"Google search '{query}' returned {len(urls)} URLs")
-                    return urls
-    
-    logger.info(f"Google search '{query}' returned {len(urls)} URLs (fewer than requested)")
-    return urls
\ No newline at end of file
+            # Any post URL form (/p/, /reel/, /reels/, /tv/, with or without a username)
+            if canonical_shortcode(item.get("link") or ""):
+                results.append(item)
+
+                if len(results) >= limit:
+                    logger.info(f"Google search '{query}' returned {len(results)} URLs")
+                    return results
+
+        if page_yield < settings.GOOGLE_SEARCH_MIN_PAGE_YIELD:
+            logger.info(
+                f"Google search '{query}' stopped after page {page + 1}: "
+                f"{page_yield:.0%} new shortcodes"
+            )
+            return results
+
+    logger.info(f"Google search '{query}' returned {len(results)} URLs (fewer than requested)")
+    return results
+
+
+def google_search_many(
+    queries: List[str],
+    limit: int = 30,
+    tracker: Optional[YieldTracker] = None,
+    limits: Optional[Dict[str, int]] = None,
+) -> Dict[str, List[dict]]:
+    """
+    google_search_instagram_items() for every query, run concurrently.
+    Pages of one query stay sequential, so a query still stops at its last
+    page (or when its yield drops); wall time is about the slowest query
+    instead of the sum. limits overrides limit per query.
+    """
+    unique = list(dict.fromkeys(queries))
+    if not unique:
+        return {}
+    limits = limits or {}
+
+    def search(query: str) -> List[dict]:
+        return google_search_instagram_items(query, limits.get(query, limit), tracker)
+
+    with ThreadPoolExecutor(
+        max_workers=min(settings.GOOGLE_SEARCH_MAX_IN_FLIGHT, len(unique)),
+        thread_name_prefix="google-search",
+    ) as pool:
+        results = dict(zip(unique, pool.map(search, unique)))
+
+    if search_cache:
+        logger.info(f"Google search cache: {search_cache.hits} hits, {search_cache.misses} misses")
+    return results
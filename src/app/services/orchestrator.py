@@ -1,8 +1,12 @@
 from sqlalchemy.orm import Session
 from src.app.services.llm import generate_search_queries
-from src.app.services.google_search import google_search_instagram_posts
+from src.app.services.google_search import google_search_many
 from src.app.services.extractors import extract_username_from_post
-from src.app.jobs.enqueue import enqueue_post_jobs
+from src.app.jobs.enqueue import enqueue_post_jobs, enqueue_resolved_posts
+from src.app.services.search_owners import OwnerStats, extract_owners
+from src.app.services.url_canonical import canonical_shortcode
+from src.app.services.seen_filter import get_seen_filter
+from src.app.services.search_yield import YieldTracker, plan_queries, record_query_yields
 from src.app.core.db.models import ScrapeJobSource
 import logging
 
@@ -12,7 +16,8 @@ logger = logging.getLogger(__name__)
 def run_discovery(prompt: str, db: Session) -> None:
     """
     Discovery = query generation + Google search + URL enqueue.
-    No Instagram fetch. No username parsing.
+    No Instagram fetch. Post owners named in the search metadata are
+    enqueued as PROFILE jobs directly; the rest go to the post worker.
     """
 
     logger.info("Discovery started for prompt: %s", prompt)
@@ -22,7 +27,13 @@ def run_discovery(prompt: str, db: Session) -> None:
         logger.warning("No queries generated from prompt")
         return
 
-    discovered_urls: set[str] = set()
+    # Known shortcodes count as zero yield while paging, so refresh first
+    seen = get_seen_filter()
+    if seen:
+        seen.refresh(db)
+
+    # Raw result items; dedup by shortcode happens below
+    discovered_items: list[dict] = []
 
     # for query in queries:
     #     urls = google_search_instagram_posts(query, limit=20)
@@ -31,23 +42,66 @@ def run_discovery(prompt: str, db: Session) -> None:
     #         if "/p/" in url or "/reel/" in url:
     #             discovered_urls.add(url.split("?")[0])
 
-    for query in queries:
-        urls = google_search_instagram_posts(query, limit=30)
-        discovered_urls.update(url.split("?")[0] for url in urls)
+    # Queries run concurrently, best historical yield first; each stops
+    # paging once its pages stop turning up new shortcodes
+    plan = plan_queries(db, queries, limit=30)
+    tracker = YieldTracker(is_known=seen.__contains__ if seen else None)
+    results = google_search_many(
+        [query for query, _ in plan],
+        limit=30,
+        tracker=tracker,
+        limits=dict(plan),
+    )
+    for items in results.values():
+        discovered_items.extend(items)
+
+    record_query_yields(db, tracker)
+    db.commit()
 
-    if not discovered_urls:
+    if not discovered_items:
         logger.info("No post URLs discovered")
         return
 
-    enqueue_post_jobs(
-        urls=discovered_urls,
+    shortcodes = [canonical_shortcode(item["link"]) for item in discovered_items]
+
+    # Drop posts seen in earlier runs in-process; only the rest reach the DB
+    if seen:
+        candidates = {shortcode for shortcode in shortcodes if shortcode}
+        fresh = set(seen.filter_unseen(candidates))
+        logger.info(
+            "Seen filter dropped %d of %d shortcodes (fp rate %.4f)",
+            len(candidates) - len(fresh),
+            len(candidates),
+            seen.fp_rate(),
+        )
+        discovered_items = [
+            item for item, shortcode in zip(discovered_items, shortcodes) if shortcode in fresh
+        ]
+
+    # No fallback here: the post worker looks up whatever stays unresolved
+    stats = OwnerStats()
+    owners = extract_owners(discovered_items, stats=stats)
+    logger.info("Owner extraction: %s", stats)
+
+    resolved = {shortcode: owner for shortcode, owner in owners.items() if owner}
+    posts, profiles = enqueue_resolved_posts(resolved, ScrapeJobSource.GOOGLE, db)
+
+    result = enqueue_post_jobs(
+        urls=[shortcode for shortcode, owner in owners.items() if not owner],
         source=ScrapeJobSource.GOOGLE,
         db=db,
     )
 
-    logger.info("Discovered URLs: %s", discovered_urls)
+    logger.info("Discovered posts: %s", list(owners))
 
-    logger.info("Discovery finished. POST jobs enqueued: %d", len(discovered_urls))
+    logger.info(
+        "Discovery finished. POST jobs enqueued: %d (%d duplicates), "
+        "resolved from metadata: %d posts, %d new PROFILE jobs",
+        result.inserted,
+        result.duplicates,
+        posts.inserted,
+        profiles.inserted,
+    )
 
 
 def discover_usernames_from_queries(queries: list[str]) -> set[str]:
@@ -56,14 +110,13 @@ def discover_usernames_from_queries(queries: list[str]) -> set[str]:
     Pure function. No DB access.
     """
 
-    discovered: set[str] = set()
-
-    for query in queries:
-        post_urls = google_search_instagram_posts(query, limit=20)
+    items: list[dict] = []
+    for query_items in google_search_many(queries, limit=20).values():
+        items.extend(query_items)
 
-        for post_url in post_urls:
-            username = extract_username_from_post(post_url)
-            if username:
-                discovered.add(username)
+    # Page fetch only for posts whose metadata names no owner, once per post
+    stats = OwnerStats()
+    owners = extract_owners(items, fallback=extract_username_from_post, stats=stats)
+    logger.info("Owner extraction: %s", stats)
 
-    return discovered
+    return {owner for owner in owners.values() if owner}
@@ -0,0 +1,82 @@
+from typing import Optional
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from src.app.core.db.models import PostMedia, PostsMetadata
+
+
+def _normalize_username(username: str) -> str:
+    return username.strip().lstrip("@").lower()
+
+
+def _mentions_clause(username: str):
+    """
+    Tags or collaborates with username (already normalized).
+    """
+    tagged = select(PostMedia.post_shortcode).where(PostMedia.tagged_users.contains([username]))
+    return or_(
+        PostsMetadata.collaborators.contains([username]),
+        PostsMetadata.shortcode.in_(tagged),
+    )
+
+
+def posts_collaborating_with(db: Session, username: str, limit: Optional[int] = None) -> list[PostsMetadata]:
+    """
+    Posts that list @username as a collaborator, newest first.
+    Served by the GIN index on posts_metadata.collaborators (@> containment).
+    """
+    query = (
+        db.query(PostsMetadata)
+        .filter(PostsMetadata.collaborators.contains([_normalize_username(username)]))
+        .order_by(PostsMetadata.posted_on.desc().nullslast())
+    )
+    if limit:
+        query = query.limit(limit)
+    return query.all()
+
+
+def posts_tagging(db: Session, username: str, limit: Optional[int] = None) -> list[PostsMetadata]:
+    """
+    Posts with at least one slide that tags @username, newest first.
+    Served by the GIN index on post_media.tagged_users.
+    """
+    tagged = select(PostMedia.post_shortcode).where(
+        PostMedia.tagged_users.contains([_normalize_username(username)])
+    )
+    query = (
+        db.query(PostsMetadata)
+        .filter(PostsMetadata.shortcode.in_(tagged))
+        .order_by(PostsMetadata.posted_on.desc().nullslast())
+    )
+    if limit:
+        query = query.limit(limit)
+    return query.all()
+
+
+def posts_mentioning(db: Session, username: str, limit: Optional[int] = None) -> list[PostsMetadata]:
+    """
+    Posts that tag or collaborate with @username, newest first.
+    """
+    query = (
+        db.query(PostsMetadata)
+        .filter(_mentions_clause(_normalize_username(username)))
+        .order_by(PostsMetadata.posted_on.desc().nullslast())
+    )
+    if limit:
+        query = query.limit(limit)
+    return query.all()
+
+
+def accounts_connected_to(db: Session, username: str) -> list[int]:
+    """
+    users.id of accounts whose posts tag or collaborate with @username,
+    for building outreach lists.
+    """
+    rows = (
+        db.query(PostsMetadata.posted_by)
+        .filter(_mentions_clause(_normalize_username(username)))
+        .distinct()
+        .all()
+    )
+    return [row.posted_by for row in rows]
@@ -0,0 +1,81 @@
+"""
+Persistent TTL cache of Google Custom Search result pages.
+
+One row per (query, start): the result items of that page as JSON. Repeated
+or overlapping prompts reuse pages instead of spending API quota and a
+round trip. Failed requests are never cached; empty pages are, since
+"no more results" is an answer too.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    query TEXT NOT NULL,
+    start INTEGER NOT NULL,
+    items TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (query, start)
+);
+"""
+
+
+class SearchCache:
+    def __init__(self, path: str, ttl_seconds: float):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self._conn: Optional[sqlite3.Connection] = None
+        # One connection shared by the search threads
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def get(self, query: str, start: int) -> Optional[list[dict]]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT items FROM pages WHERE query = ? AND start = ? AND fetched_at > ?",
+                (query, start, time.time() - self.ttl_seconds),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, query: str, start: int, items: list[dict]) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO pages (query, start, items, fetched_at) VALUES (?, ?, ?, ?)",
+                (query, start, json.dumps(items), time.time()),
+            )
+            conn.commit()
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            conn = self._connect()
+            deleted = conn.execute(
+                "DELETE FROM pages WHERE fetched_at <= ?",
+                (time.time() - self.ttl_seconds,),
+            ).rowcount
+            conn.commit()
+            return deleted
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,136 @@
+"""
+Post owners from Google Custom Search result metadata.
+
+Result items for Instagram posts usually name the owner already, e.g.
+    title / og:title / twitter:title:  "Jane Doe (@janedoe) on Instagram: ..."
+    snippet / og:description:          "1,234 likes, 56 comments - janedoe on March 3, 2024: ..."
+Reading it there saves the per-post lookup (a page fetch, or an Instagram
+request in the post worker). Only results without a usable handle fall
+back to that lookup.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, Optional
+
+from src.app.services.url_canonical import canonical_shortcode, post_url
+
+HANDLE = r"[A-Za-z0-9_.]{1,30}"
+
+# Only structural positions count: a handle quoted in the caption ("Sunset
+# shoot with (@nikon)", "Follow @brand on Instagram") is a mention, not the owner.
+# Title fields: "Jane Doe (@janedoe) on Instagram: ..." / "... (@janedoe) • Instagram ..."
+# and "@janedoe on Instagram: ...", with no quote (caption) before the handle.
+TITLE_PATTERNS = [
+    re.compile(rf'^[^"\u201c]*?\(@({HANDLE})\)\s*(?:on Instagram\b|\u2022)', re.IGNORECASE),
+    re.compile(rf"^\s*@({HANDLE}) on Instagram\b", re.IGNORECASE),
+]
+# Description fields: "1,234 likes, 56 comments - janedoe on March 3, 2024: ..."
+DESCRIPTION_PATTERNS = [
+    re.compile(
+        rf"^\s*(?:[\d,.]+[KkMm]?\s+(?:likes?|comments?),?\s*)+-\s+({HANDLE}) on\b",
+        re.IGNORECASE,
+    ),
+]
+
+TITLE_METATAGS = ("og:title", "twitter:title")
+DESCRIPTION_METATAGS = ("og:description", "twitter:description")
+
+
+@dataclass
+class OwnerStats:
+    """
+    Where post owners came from. hit_rate is the share resolved from
+    search metadata alone, i.e. lookups saved.
+    """
+    metadata: int = 0
+    fallback: int = 0
+    missed: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.metadata + self.fallback + self.missed
+
+    @property
+    def hit_rate(self) -> float:
+        return self.metadata / self.total if self.total else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.metadata}/{self.total} owners from search metadata "
+            f"(hit rate {self.hit_rate:.0%}), {self.fallback} from fallback lookups, {self.missed} unresolved"
+        )
+
+
+def _metadata_texts(item: dict, key: str, metatag_keys: tuple) -> Iterator[str]:
+    if item.get(key):
+        yield item[key]
+    for tags in (item.get("pagemap") or {}).get("metatags") or []:
+        for tag in metatag_keys:
+            if tags.get(tag):
+                yield tags[tag]
+
+
+def _valid_handle(handle: str) -> bool:
+    return not handle.startswith(".") and not handle.endswith(".") and ".." not in handle
+
+
+def owner_from_search_item(item: dict) -> Optional[str]:
+    """
+    Owner handle named in a search item's snippet or title (or their
+    og/twitter metatags), or None. The likes/comments description is the
+    most reliable, so it is tried first.
+    """
+    candidates = [
+        (DESCRIPTION_PATTERNS, _metadata_texts(item, "snippet", DESCRIPTION_METATAGS)),
+        (TITLE_PATTERNS, _metadata_texts(item, "title", TITLE_METATAGS)),
+    ]
+    for patterns, texts in candidates:
+        for text in texts:
+            for pattern in patterns:
+                match = pattern.search(text)
+                if match and _valid_handle(match.group(1)):
+                    return match.group(1).lower()
+    return None
+
+
+def extract_owners(
+    items: Iterable[dict],
+    fallback: Optional[Callable[[str], Optional[str]]] = None,
+    stats: Optional[OwnerStats] = None,
+) -> dict[str, Optional[str]]:
+    """
+    shortcode -> owner for search result items, one entry per post.
+    Owners come from the item metadata; when that fails, fallback (given a
+    post URL) is tried if provided. Unresolved posts map to None.
+    """
+    stats = stats if stats is not None else OwnerStats()
+    owners: dict[str, Optional[str]] = {}
+
+    for item in items:
+        shortcode = canonical_shortcode(item.get("link") or "")
+        if not shortcode or owners.get(shortcode):
+            continue
+
+        owner = owner_from_search_item(item)
+        if owner:
+            if shortcode in owners:
+                # An earlier copy of this post missed; this one settles it
+                stats.missed -= 1
+            stats.metadata += 1
+            owners[shortcode] = owner
+        elif shortcode not in owners:
+            owners[shortcode] = None
+            stats.missed += 1
+
+    if fallback:
+        for shortcode, owner in owners.items():
+            if owner:
+                continue
+            owner = fallback(post_url(shortcode))
+            if owner:
+                owners[shortcode] = owner
+                stats.missed -= 1
+                stats.fallback += 1
+
+    return owners
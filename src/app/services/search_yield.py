@@ -0,0 +1,166 @@
+"""
+New-shortcode yield of Google search queries.
+
+During a discovery run a YieldTracker counts, per result page, how many
+shortcodes are new: not on an earlier page or query of this run, and not
+known from earlier runs (seen filter). The search client stops paging a
+query once a page's share of new shortcodes drops below
+GOOGLE_SEARCH_MIN_PAGE_YIELD.
+
+Per-run counts are aggregated into search_query_stats by query pattern, so
+later prompts can down-rank patterns that historically yield little:
+plan_queries() runs them last, with a one-page probe budget. Pages served
+from the search cache only drive the in-run stop: they cost no quota, and
+a repeated prompt would otherwise score its own earlier results as stale.
+"""
+
+import re
+import threading
+from dataclasses import dataclass
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from src.app.core.config import settings
+from src.app.core.db.models import SearchQueryStats
+from src.app.core.logging_config import logger
+from src.app.services.url_canonical import canonical_shortcode
+
+_TOKEN_RE = re.compile(r"[#@]?\w+")
+
+# Pseudo-results (one page) that keep a pattern with little history near the threshold
+PRIOR_RESULTS = 10
+
+
+def query_pattern(query: str) -> str:
+    """
+    Order- and punctuation-insensitive form of a query: its sorted, lowercased
+    words, hashtags and mentions. "London bakery" and "bakery, london" share
+    one pattern.
+    """
+    return " ".join(sorted(set(_TOKEN_RE.findall(query.lower()))))
+
+
+@dataclass
+class QueryYield:
+    query: str
+    pages: int = 0
+    results: int = 0
+    new_shortcodes: int = 0
+
+    @property
+    def yield_ratio(self) -> float:
+        return self.new_shortcodes / self.results if self.results else 0.0
+
+
+class YieldTracker:
+    """
+    Shared by the search threads of one discovery run.
+    """
+
+    def __init__(self, is_known: Optional[Callable[[str], bool]] = None):
+        self.is_known = is_known
+        self.queries: dict[str, QueryYield] = {}
+        self._seen: set[str] = set()
+        self._lock = threading.Lock()
+
+    def record_page(self, query: str, items: list[dict], cached: bool = False) -> float:
+        """
+        Books a result page of query. Returns the page's share of new
+        shortcodes, i.e. its marginal yield. Cached pages count toward the
+        run's seen shortcodes but not toward the query's persisted stats.
+        """
+        shortcodes = [canonical_shortcode(item.get("link") or "") for item in items]
+        with self._lock:
+            new = 0
+            for shortcode in shortcodes:
+                if not shortcode or shortcode in self._seen:
+                    continue
+                self._seen.add(shortcode)
+                if self.is_known is None or not self.is_known(shortcode):
+                    new += 1
+            if not cached:
+                stats = self.queries.setdefault(query, QueryYield(query))
+                stats.pages += 1
+                stats.results += len(items)
+                stats.new_shortcodes += new
+        return new / len(items) if items else 0.0
+
+
+def _predicted_yield(row: Optional[SearchQueryStats]) -> float:
+    """
+    Historical new-shortcode share of a pattern, pulled toward the stop
+    threshold while it has few pages behind it.
+    """
+    if row is None:
+        return settings.GOOGLE_SEARCH_MIN_PAGE_YIELD
+    prior_new = PRIOR_RESULTS * settings.GOOGLE_SEARCH_MIN_PAGE_YIELD
+    return (row.new_shortcodes + prior_new) / (row.results + PRIOR_RESULTS)
+
+
+def plan_queries(db: Session, queries: Iterable[str], limit: int) -> list[tuple[str, int]]:
+    """
+    (query, result limit) in run order: best historical yield first.
+    Patterns with enough history and a yield under the stop threshold keep
+    only a one-page probe, so a pattern that improves can recover.
+    """
+    queries = list(dict.fromkeys(queries))
+    patterns = {query: query_pattern(query) for query in queries}
+    rows = {
+        row.pattern: row
+        for row in db.scalars(
+            select(SearchQueryStats).where(SearchQueryStats.pattern.in_(set(patterns.values())))
+        )
+    }
+
+    planned = []
+    for query in queries:
+        row = rows.get(patterns[query])
+        predicted = _predicted_yield(row)
+        low_yield = (
+            row is not None
+            and row.pages >= settings.GOOGLE_SEARCH_YIELD_MIN_PAGES
+            and predicted < settings.GOOGLE_SEARCH_MIN_PAGE_YIELD
+        )
+        planned.append((predicted, query, min(limit, settings.GOOGLE_SEARCH_PROBE_LIMIT) if low_yield else limit))
+
+    planned.sort(key=lambda entry: entry[0], reverse=True)
+    down_ranked = [query for _, query, query_limit in planned if query_limit < limit]
+    if down_ranked:
+        logger.info(f"Down-ranked {len(down_ranked)} low-yield queries to a probe: {down_ranked}")
+    return [(query, query_limit) for _, query, query_limit in planned]
+
+
+def record_query_yields(db: Session, tracker: YieldTracker) -> None:
+    """
+    Adds this run's per-query counts to search_query_stats. Does not commit.
+    """
+    for stats in tracker.queries.values():
+        values = {
+            "pattern": query_pattern(stats.query),
+            "last_query": stats.query,
+            "runs": 1,
+            "pages": stats.pages,
+            "results": stats.results,
+            "new_shortcodes": stats.new_shortcodes,
+        }
+        stmt = pg_insert(SearchQueryStats).values(values)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[SearchQueryStats.pattern],
+                set_={
+                    "last_query": stmt.excluded.last_query,
+                    "runs": SearchQueryStats.runs + 1,
+                    "pages": SearchQueryStats.pages + stmt.excluded.pages,
+                    "results": SearchQueryStats.results + stmt.excluded.results,
+                    "new_shortcodes": SearchQueryStats.new_shortcodes + stmt.excluded.new_shortcodes,
+                    "updated_at": func.now(),
+                },
+            )
+        )
+        logger.info(
+            f"Query '{stats.query}': {stats.new_shortcodes} new of {stats.results} results "
+            f"over {stats.pages} pages ({stats.yield_ratio:.0%})"
+        )
@@ -0,0 +1,331 @@
+"""
+Persistent Bloom filter of shortcodes we already know about.
+
+Discovery drops known shortcodes in-process, before any DB or network round
+trip. The filter lives in a single memory-mapped file, so every process on
+the host shares one copy through the page cache:
+
+    [header: magic, bits, hashes, items, jobs watermark, posts watermark][bits]
+
+Writers (refresh, add_many, rebuild) take an exclusive fcntl lock on
+<path>.lock. Readers take no lock: bits are only ever set, never cleared, so
+a concurrent reader at worst misses a shortcode that is being added, and
+the unique constraint on scrape_jobs catches it. A resize writes a new file
+and renames it over the old one. Readers pick it up on their next refresh().
+
+refresh() is incremental. It adds posts_metadata rows scraped since the
+posts watermark and POST jobs created since the jobs watermark.
+
+A false positive drops a genuinely new post, with probability fp_rate().
+"""
+
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from datetime import datetime, timedelta, UTC
+from pathlib import Path
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.app.core.config import settings
+from src.app.core.db.models import PostsMetadata, ScrapeJob, ScrapeJobType
+from src.app.core.logging_config import logger
+from src.app.services.url_canonical import canonical_shortcode
+
+MAGIC = b"SEENBF01"
+# magic, bits, hashes, items, jobs watermark (scrape_jobs.id), posts watermark (scraped_at epoch)
+HEADER = struct.Struct("<8sQQQQd")
+HEADER_SIZE = 64
+
+# Rows committed late (long transactions) can land behind a watermark.
+# Re-reading a little overlap is free: already-present shortcodes are skipped.
+JOBS_ID_LOOKBACK = 10_000
+POSTS_TIME_LOOKBACK = timedelta(hours=1)
+REFRESH_BATCH = 10_000
+
+
+def optimal_shape(capacity: int, fp_rate: float) -> tuple[int, int]:
+    """
+    (bits, hashes) for a Bloom filter holding capacity items at fp_rate.
+    """
+    bits = math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2)
+    bits = (bits + 7) // 8 * 8
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+class SeenFilter:
+    def __init__(self, path: str, capacity: int, fp_rate: float):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.capacity = capacity
+        self.target_fp_rate = fp_rate
+        self._file = None
+        self._mm: Optional[mmap.mmap] = None
+        self._inode: Optional[int] = None
+        self.bits = 0
+        self.hashes = 0
+
+    # ------------------------------------------------------------------
+    # File handling
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _locked(self):
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _create(self, path: Path, capacity: int) -> None:
+        bits, hashes = optimal_shape(capacity, self.target_fp_rate)
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, bits, hashes, 0, 0, 0.0).ljust(HEADER_SIZE, b"\0"))
+            f.truncate(HEADER_SIZE + bits // 8)
+        logger.info(f"Created seen filter {path}: {bits // 8 / 1e6:.1f}MB, {hashes} hashes, capacity {capacity}")
+
+    def open(self) -> "SeenFilter":
+        if not self.path.exists():
+            with self._locked():
+                if not self.path.exists():
+                    self._create(self.path, self.capacity)
+        self._map()
+        return self
+
+    def _map(self) -> None:
+        self.close()
+        self._file = open(self.path, "r+b")
+        # MAP_SHARED: every process mapping the file reads the same pages
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        magic, self.bits, self.hashes, _, _, _ = self._header()
+        if magic != MAGIC:
+            raise RuntimeError(f"{self.path} is not a seen filter")
+
+    def _reopen_if_replaced(self) -> None:
+        try:
+            replaced = os.stat(self.path).st_ino != self._inode
+        except FileNotFoundError:
+            return
+        if replaced:
+            self._map()
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _header(self) -> tuple:
+        return HEADER.unpack_from(self._mm, 0)
+
+    def _write_header(self, items: int, jobs_watermark: int, posts_watermark: float) -> None:
+        HEADER.pack_into(self._mm, 0, MAGIC, self.bits, self.hashes, items, jobs_watermark, posts_watermark)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def _positions(self, shortcode: str) -> list[int]:
+        # Double hashing over one 128-bit digest (Kirsch-Mitzenmacher)
+        h1, h2 = struct.unpack("<QQ", hashlib.blake2b(shortcode.encode(), digest_size=16).digest())
+        h2 |= 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def __contains__(self, shortcode: str) -> bool:
+        mm = self._mm
+        return all(mm[HEADER_SIZE + (p >> 3)] & (1 << (p & 7)) for p in self._positions(shortcode))
+
+    def filter_unseen(self, shortcodes: Iterable[str]) -> list[str]:
+        """
+        Shortcodes not in the filter, in input order.
+        """
+        return [shortcode for shortcode in shortcodes if shortcode not in self]
+
+    # ------------------------------------------------------------------
+    # Writes (caller holds the lock)
+    # ------------------------------------------------------------------
+
+    def _add(self, shortcode: str) -> bool:
+        """
+        Sets the shortcode's bits. Returns True if it was not present yet,
+        which is what the items count tracks.
+        """
+        mm = self._mm
+        new = False
+        for p in self._positions(shortcode):
+            offset, bit = HEADER_SIZE + (p >> 3), 1 << (p & 7)
+            byte = mm[offset]
+            if not byte & bit:
+                mm[offset] = byte | bit
+                new = True
+        return new
+
+    def add_many(self, shortcodes: Iterable[str]) -> int:
+        with self._locked():
+            self._reopen_if_replaced()
+            _, _, _, items, jobs_watermark, posts_watermark = self._header()
+            added = sum(1 for shortcode in shortcodes if self._add(shortcode))
+            self._write_header(items + added, jobs_watermark, posts_watermark)
+            self._mm.flush()
+        return added
+
+    def _load_from_db(self, db: Session, jobs_watermark: int, posts_watermark: float) -> tuple[int, int, float]:
+        """
+        Adds everything newer than the watermarks. Returns (added, jobs
+        watermark, posts watermark) after the scan.
+        """
+        added = 0
+
+        since = datetime.fromtimestamp(posts_watermark, UTC) - POSTS_TIME_LOOKBACK
+        posts = db.execute(
+            select(PostsMetadata.shortcode, PostsMetadata.scraped_at)
+            .where(PostsMetadata.scraped_at > since)
+            .execution_options(yield_per=REFRESH_BATCH)
+        )
+        for shortcode, scraped_at in posts:
+            added += self._add(shortcode)
+            posts_watermark = max(posts_watermark, scraped_at.timestamp())
+
+        jobs = db.execute(
+            select(ScrapeJob.id, ScrapeJob.entity_key)
+            .where(ScrapeJob.job_type == ScrapeJobType.POST, ScrapeJob.id > jobs_watermark - JOBS_ID_LOOKBACK)
+            .execution_options(yield_per=REFRESH_BATCH)
+        )
+        for job_id, entity_key in jobs:
+            shortcode = canonical_shortcode(entity_key)
+            if shortcode:
+                added += self._add(shortcode)
+            jobs_watermark = max(jobs_watermark, job_id)
+
+        return added, jobs_watermark, posts_watermark
+
+    def refresh(self, db: Session) -> int:
+        """
+        Incremental update from posts_metadata and scrape_jobs. Grows the
+        filter (full rebuild at twice the capacity) once it holds more items
+        than it was sized for. Returns shortcodes added.
+        """
+        with self._locked():
+            self._reopen_if_replaced()
+            _, _, _, items, jobs_watermark, posts_watermark = self._header()
+            added, jobs_watermark, posts_watermark = self._load_from_db(db, jobs_watermark, posts_watermark)
+            self._write_header(items + added, jobs_watermark, posts_watermark)
+            self._mm.flush()
+            items += added
+
+        logger.info(f"Seen filter refreshed: {added} new shortcodes, {items} total")
+        if items > self.capacity_of_current_file():
+            self.rebuild(db, capacity=items * 2)
+        return added
+
+    def rebuild(self, db: Session, capacity: Optional[int] = None) -> None:
+        """
+        Full rebuild into a new file, renamed over the current one.
+        """
+        capacity = capacity or self.capacity
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with self._locked():
+            self._create(tmp_path, capacity)
+            fresh = SeenFilter(str(tmp_path), capacity, self.target_fp_rate)
+            fresh._map()
+            try:
+                added, jobs_watermark, posts_watermark = fresh._load_from_db(db, 0, 0.0)
+                fresh._write_header(added, jobs_watermark, posts_watermark)
+                fresh._mm.flush()
+            finally:
+                fresh.close()
+            os.replace(tmp_path, self.path)
+            self.capacity = capacity
+            self._map()
+        logger.info(f"Seen filter rebuilt: {added} shortcodes, capacity {capacity}")
+
+    # ------------------------------------------------------------------
+    # Stats
+    # ------------------------------------------------------------------
+
+    def capacity_of_current_file(self) -> int:
+        """
+        Items the mapped file holds at the target false-positive rate.
+        """
+        return int(self.bits * math.log(2) ** 2 / -math.log(self.target_fp_rate))
+
+    def fill_ratio(self) -> float:
+        set_bits = int.from_bytes(self._mm[HEADER_SIZE:], "little").bit_count()
+        return set_bits / self.bits
+
+    def fp_rate(self) -> float:
+        """
+        Current false-positive probability, from the share of bits set.
+        """
+        return self.fill_ratio() ** self.hashes
+
+    def stats(self) -> dict:
+        _, _, _, items, jobs_watermark, posts_watermark = self._header()
+        fill = self.fill_ratio()
+        return {
+            "path": str(self.path),
+            "size_bytes": HEADER_SIZE + self.bits // 8,
+            "bits": self.bits,
+            "hashes": self.hashes,
+            "items": items,
+            "capacity": self.capacity_of_current_file(),
+            "fill_ratio": round(fill, 4),
+            "fp_rate": fill ** self.hashes,
+            "jobs_watermark": jobs_watermark,
+            "posts_watermark": datetime.fromtimestamp(posts_watermark, UTC).isoformat() if posts_watermark else None,
+        }
+
+
+_seen_filter: Optional[SeenFilter] = None
+
+
+def get_seen_filter() -> Optional[SeenFilter]:
+    """
+    Process-wide filter, opened on first use. None when disabled.
+    """
+    global _seen_filter
+    if not settings.SEEN_FILTER_ENABLED:
+        return None
+    if _seen_filter is None:
+        _seen_filter = SeenFilter(
+            settings.SEEN_FILTER_PATH,
+            settings.SEEN_FILTER_CAPACITY,
+            settings.SEEN_FILTER_FP_RATE,
+        ).open()
+    return _seen_filter
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.app.core.db.session import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain the seen-shortcode filter.")
+    parser.add_argument("--rebuild", action="store_true", help="full rebuild instead of an incremental refresh")
+    parser.add_argument("--stats", action="store_true", help="only print size and false-positive rate")
+    args = parser.parse_args()
+
+    seen = SeenFilter(settings.SEEN_FILTER_PATH, settings.SEEN_FILTER_CAPACITY, settings.SEEN_FILTER_FP_RATE).open()
+    if not args.stats:
+        db = SessionLocal()
+        try:
+            if args.rebuild:
+                seen.rebuild(db)
+            else:
+                seen.refresh(db)
+        finally:
+            db.close()
+    for key, value in seen.stats().items():
+        print(f"{key:>16}: {value}")
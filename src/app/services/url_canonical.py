@@ -0,0 +1,102 @@
+"""
+Canonical form of Instagram post URLs.
+
+Search results link the same post as /p/X/, /reel/X, /reels/X, /tv/X, on
+m.instagram.com or instagr.am, under /{username}/p/X/, with tracking query
+strings, and so on. A post is identified by its shortcode alone, so POST
+jobs are keyed on it: every form of a URL maps to the same job.
+"""
+
+import re
+from typing import Iterable, Optional
+from urllib.parse import unquote, urlparse
+
+POST_PATH_KINDS = {"p", "reel", "reels", "tv"}
+INSTAGRAM_HOSTS = {"instagram.com", "www.instagram.com", "m.instagram.com", "instagr.am", "www.instagr.am"}
+
+# Post shortcodes are 10-11 characters today; private posts carry longer ones
+SHORTCODE_RE = re.compile(r"[A-Za-z0-9_-]{6,64}")
+# Pages that live under a post path kind but are not posts (/reels/audio/{id}/, ...)
+NON_POST_SEGMENTS = frozenset({"audio", "explore", "locations", "tags"})
+
+# Fast path: one anchored match covers the forms search results actually use
+FAST_POST_URL_RE = re.compile(
+    r"(?:https?://)?(?:www\.|m\.)?(?:instagram\.com|instagr\.am)"
+    r"/(?:[A-Za-z0-9_.]+/)?(?:p|reels?|tv)/"
+    rf"(?!(?:{'|'.join(sorted(NON_POST_SEGMENTS))})(?:[/?#]|$))"
+    r"([A-Za-z0-9_-]{6,64})(?:[/?#]|$)",
+    re.IGNORECASE,
+)
+
+
+def _is_shortcode(candidate: str) -> bool:
+    return bool(SHORTCODE_RE.fullmatch(candidate)) and candidate.lower() not in NON_POST_SEGMENTS
+
+
+def _shortcode_from_parsed(url: str) -> Optional[str]:
+    """
+    Slow path: full URL parsing for anything the fast regex rejects
+    (ports, credentials, percent-encoding, stray whitespace and the like).
+    """
+    candidate = unquote(url.strip())
+    if "://" not in candidate:
+        candidate = "https://" + candidate.lstrip("/")
+
+    try:
+        parsed = urlparse(candidate)
+        host = (parsed.hostname or "").lower()
+    except ValueError:
+        return None
+    if host not in INSTAGRAM_HOSTS:
+        return None
+
+    parts = [part for part in parsed.path.split("/") if part]
+    # /{kind}/{shortcode} or /{username}/{kind}/{shortcode}
+    for index in (0, 1):
+        if len(parts) > index + 1 and parts[index].lower() in POST_PATH_KINDS:
+            shortcode = parts[index + 1]
+            if _is_shortcode(shortcode):
+                return shortcode
+    return None
+
+
+def canonical_shortcode(url: str) -> Optional[str]:
+    """
+    Shortcode of an Instagram post URL in any of its forms, or None if the
+    URL is not a post. A bare shortcode is returned as is, so the function
+    is idempotent and safe on already-canonical job keys.
+    """
+    match = FAST_POST_URL_RE.match(url)
+    if match:
+        return match.group(1)
+    if _is_shortcode(url):
+        return url
+    return _shortcode_from_parsed(url)
+
+
+def canonical_shortcodes(urls: Iterable[str]) -> tuple[list[str], list[str]]:
+    """
+    Canonicalizes a batch of URLs. Returns (shortcodes, rejected):
+    shortcodes in input order, repeats included so callers can count them,
+    and the URLs that are not Instagram posts.
+    """
+    match = FAST_POST_URL_RE.match
+    shortcodes: list[str] = []
+    rejected: list[str] = []
+
+    for url in urls:
+        fast = match(url)
+        if fast:
+            shortcodes.append(fast.group(1))
+            continue
+        shortcode = canonical_shortcode(url)
+        if shortcode:
+            shortcodes.append(shortcode)
+        else:
+            rejected.append(url)
+
+    return shortcodes, rejected
+
+
+def post_url(shortcode: str) -> str:
+    return f"https://www.instagram.com/p/{shortcode}/"
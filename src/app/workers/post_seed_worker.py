@@ -1,17 +1,49 @@
 
 import time
 import json
+import queue
 import random
 import requests
+import threading
 import traceback
+from dataclasses import dataclass
 from datetime import datetime, UTC
 from typing import Optional, Dict, Tuple
 
+from sqlalchemy import func, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from src.app.core.db.models import User, PostsMetadata, ScrapeJob, ScrapeJobType, ScrapeJobStatus,PostMedia
 from src.app.core.db.session import SessionLocal
+from src.app.core.config import settings
 from src.app.core.logging_config import logger
-from src.app.instagram.client import build_authenticated_session
+from src.app.instagram.client import (
+    GovernedSession,
+    classify_feed_payload,
+    classify_feed_status,
+    get_browser_headers,
+    parse_profile_id_a1,
+    parse_profile_id_graphql,
+    parse_profile_id_search,
+)
+from src.app.instagram.archive import archive_payload
+from src.app.instagram.hedged_resolver import HedgedResolver
+from src.app.instagram.session_manager import get_session, session_manager
+from src.app.instagram.retry import call_with_retry, retry_stats, breaker_states
+from src.app.instagram.rate_governor import governor, rate_controller
+from src.app.instagram.profile_ids import get_known_profile_id, remember_profile_id
+from src.app.jobs.notify import JobListener
+from src.app.jobs.queue import (
+    POSTS_STAGE,
+    JobFailure,
+    LeaseHeartbeat,
+    classify_failure,
+    claim_next,
+    fail_job,
+    finish_job,
+    reap_expired_leases,
+    requeue_checkpointed,
+)
 from src.app.services.email_service import send_alert_email
 from src.app.services.extractors import extract_collaborators, extract_media_items
 
@@ -19,31 +51,9 @@ from src.app.services.extractors import extract_collaborators, extract_media_ite
 # We will use this module-level logger which is configured in logging_config
 # The user snippet used its own config, but we should adhere to project standards.
 
-# User agents list for rotation (realistic browser headers)
-USER_AGENTS = [
-    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0",
-    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15",
-]
-
-# Request headers template for realistic browser behavior
-def get_browser_headers() -> Dict[str, str]:
-    """Generate realistic browser headers with rotated User-Agent."""
-    return {
-        "User-Agent": random.choice(USER_AGENTS),
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Accept-Encoding": "gzip, deflate, br",
-        "Connection": "keep-alive",
-        "Upgrade-Insecure-Requests": "1",
-        "Sec-Fetch-Dest": "document",
-        "Sec-Fetch-Mode": "navigate",
-        "Sec-Fetch-Site": "none",
-        "Cache-Control": "max-age=0",
-        "Referer": "https://www.instagram.com/",
-    }
+# Pages fetched ahead of the persist stage (full seeds; incremental seeds fetch one page on request)
+PIPELINE_QUEUE_SIZE = 2
+PIPELINE_JOIN_TIMEOUT = 20  # seconds
 
 def get_random_delay(min_seconds: float = 45, max_seconds: float = 240) -> float:
     """
@@ -55,7 +65,10 @@ def get_random_delay(min_seconds: float = 45, max_seconds: float = 240) -> float
 def get_csrf_token(session: requests.Session) -> Optional[str]:
     """
     Safely extract csrftoken even if multiple exist for different domains/paths.
+    Managed sessions answer from their cached cookie instead of walking the jar.
     """
+    if isinstance(session, GovernedSession):
+        return session.csrf_token()
     for cookie in session.cookies:
         if cookie.name == "csrftoken":
             return cookie.value
@@ -64,29 +77,9 @@ def get_csrf_token(session: requests.Session) -> Optional[str]:
 def refresh_csrf_token(session: requests.Session) -> bool:
     """
     Refresh CSRF token by visiting the main Instagram page.
-    This prevents CSRF token expiry issues during long scraping sessions.
     Returns True if successful, False otherwise.
     """
-    try:
-        logger.info("Attempting to refresh CSRF token...")
-        headers = get_browser_headers()
-        response = session.get("https://www.instagram.com/", headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            new_csrf = get_csrf_token(session)
-            if new_csrf:
-                logger.info(f"CSRF token refreshed successfully")
-                return True
-            else:
-                logger.warning("CSRF token not found after refresh attempt")
-                return False
-        else:
-            logger.warning(f"Failed to refresh CSRF token (status: {response.status_code})")
-            return False
-            
-    except Exception as e:
-        logger.error(f"Exception during CSRF token refresh: {e}")
-        return False
+    return session_manager.refresh_csrf(session)
 
 def resolve_profile_id_graphql(session: requests.Session, username: str) -> Tuple[Optional[str], str]:
     """
@@ -113,13 +106,9 @@ def resolve_profile_id_graphql(session: requests.Session, username: str) -> Tupl
             if "message" in data:
                 logger.warning(f"Instagram message: {data['message']}")
                 
-            user = data.get("data", {}).get("user")
-            if user and user.get("id"):
-                return user["id"], "active"
-                
-            user = data.get("user")
-            if user and user.get("id"):
-                return user["id"], "active"
+            profile_id = parse_profile_id_graphql(data)
+            if profile_id:
+                return profile_id, "active"
                 
     except Exception as e:
         logger.error(f"GraphQL Fallback failed: {e}")
@@ -140,24 +129,18 @@ def resolve_profile_id_search(session: requests.Session, username: str) -> Tuple
         logger.info(f"Search Fallback status: {response.status_code}")
         
         if response.status_code == 200:
-            data = response.json()
-            for user_wrapper in data.get("users", []):
-                user = user_wrapper.get("user")
-                if user and user.get("username") == username:
-                    return str(user.get("pk")), "active"
+            profile_id = parse_profile_id_search(response.json(), username)
+            if profile_id:
+                return profile_id, "active"
     except Exception as e:
         logger.error(f"Search Fallback failed: {e}")
         
     return None, "empty_data"
 
-def resolve_profile_id(session: requests.Session, username: str) -> Tuple[Optional[str], str]:
+def resolve_profile_id_a1(session: requests.Session, username: str) -> Tuple[Optional[str], str]:
     """
-    Resolves Instagram User ID (PK) for a given username.
-    Strategy 1: GET /{username}/?__a=1&__d=dis
-    Strategy 2: GraphQL web_profile_info
-    Strategy 3: Search endpoint
+    Primary resolution: GET /{username}/?__a=1&__d=dis
     """
-    logger.info(f"Resolving profile ID for: {username}")
     url = f"https://www.instagram.com/{username}/?__a=1&__d=dis"
     
     # Get realistic headers
@@ -174,182 +157,298 @@ def resolve_profile_id(session: requests.Session, username: str) -> Tuple[Option
         
         if response.status_code == 200:
             try:
-                data = response.json()
-                profile_id = None
-                if "graphql" in data and "user" in data["graphql"]:
-                    profile_id = data["graphql"]["user"].get("id")
-                elif "user" in data:
-                    profile_id = data["user"].get("id")
-                    
+                profile_id = parse_profile_id_a1(response.json())
                 if profile_id:
-                    logger.info(f"Resolved profile_id via __a=1: {profile_id}")
-                    return str(profile_id), "active"
+                    return profile_id, "active"
             except Exception as e:
                 logger.warning(f"Failed to parse __a=1 response: {e}")
     except Exception as e:
         logger.error(f"Resolution request failed: {e}")
 
-    # 2. Try GraphQL fallback
-    profile_id, status = resolve_profile_id_graphql(session, username)
-    if profile_id:
-        logger.info(f"Resolved profile_id via GraphQL: {profile_id}")
-        return profile_id, "active"
-
-    # 3. Try Search fallback
-    profile_id, status = resolve_profile_id_search(session, username)
-    if profile_id:
-        logger.info(f"Resolved profile_id via Search: {profile_id}")
-        return profile_id, "active"
-        
-    logger.error(f"All resolution methods failed for {username}")
     return None, "empty_data"
 
-def fetch_posts_page(session: requests.Session, profile_id: str, cursor: str = None, retry_count: int = 0) -> Tuple[Optional[Dict], str]:
+# Hedged race over the three strategies, ordered by measured success rate
+profile_id_resolver = HedgedResolver([
+    ("a1", resolve_profile_id_a1),
+    ("graphql", resolve_profile_id_graphql),
+    ("search", resolve_profile_id_search),
+])
+
+def resolve_profile_id(session: requests.Session, username: str) -> Tuple[Optional[str], str]:
     """
-    Using the stable REST API: GET https://www.instagram.com/api/v1/feed/user/{profile_id}/
-    With retry logic for transient failures.
+    Resolves Instagram User ID (PK) for a given username.
+    Strategy 1: GET /{username}/?__a=1&__d=dis
+    Strategy 2: GraphQL web_profile_info
+    Strategy 3: Search endpoint
+    The next strategy starts after an adaptive hedge delay instead of
+    waiting out the previous one's full timeout; first valid ID wins.
+    """
+    logger.info(f"Resolving profile ID for: {username}")
+    profile_id, status = profile_id_resolver.resolve(session, username)
+    if not profile_id:
+        logger.error(f"All resolution methods failed for {username}")
+    logger.info(f"Resolution strategy stats: {profile_id_resolver.snapshot()}")
+    return profile_id, status
+
+def _fetch_posts_page_once(session: requests.Session, url: str, params: Dict) -> Tuple[Optional[Dict], str]:
+    """
+    Single feed request, classified. Retries are the retry policy's job.
     """
-    url = f"https://www.instagram.com/api/v1/feed/user/{profile_id}/"
-    params = {
-        "count": 12,
-    }
-    if cursor:
-        params["max_id"] = cursor
-    
     # Get fresh headers for each request
     headers = get_browser_headers()
     csrf = get_csrf_token(session)
     if csrf:
         headers["X-CSRFToken"] = csrf
-        
-    logger.info(f"Fetching posts for ID {profile_id} (cursor: {cursor})")
-    
+
     try:
         response = session.get(url, params=params, headers=headers, timeout=15)
         
-        if response.status_code in [401, 403]:
-            logger.warning(f"Authentication error ({response.status_code}). Session may be dead.")
-            return None, "session_dead"
-        
-        if response.status_code == 429:
-            logger.warning("Rate limited (429). Too many requests.")
-            return None, "rate_limited"
-        
-        if response.status_code >= 500:
-            logger.warning(f"Server error ({response.status_code}). Retrying...")
-            if retry_count < 2:
-                time.sleep(random.uniform(5, 10))  # Brief backoff for server errors
-                return fetch_posts_page(session, profile_id, cursor, retry_count + 1)
-            return None, "server_error"
+        status = classify_feed_status(response.status_code)
+        if status == "server_error":
+            logger.warning(f"Server error ({response.status_code}).")
+        if status == "session_dead" and getattr(session, "csrf_rejected", False):
+            return None, "csrf_rejected"
+        if status:
+            return None, status
         
         res_json = response.json()
-        if res_json.get("status") == "fail":
-            message = res_json.get("message", "").lower()
-            if "login_required" in message or "checkpoint" in message:
-                logger.warning(f"Session issue: {message}")
-                return None, "session_dead"
-            logger.error(f"API Error: {res_json.get('message')}")
-            return None, "error"
+        status = classify_feed_payload(res_json)
+        if status != "active":
+            return None, status
             
         return res_json, "active"
         
     except requests.exceptions.Timeout:
-        logger.warning("Request timeout. Retrying...")
-        if retry_count < 2:
-            time.sleep(random.uniform(5, 10))
-            return fetch_posts_page(session, profile_id, cursor, retry_count + 1)
+        logger.warning("Request timeout.")
         return None, "timeout"
         
     except requests.exceptions.ConnectionError:
-        logger.warning("Connection error. Retrying...")
-        if retry_count < 2:
-            time.sleep(random.uniform(5, 10))
-            return fetch_posts_page(session, profile_id, cursor, retry_count + 1)
+        logger.warning("Connection error.")
         return None, "connection_error"
         
     except Exception as e:
         logger.error(f"Failed to parse REST response: {e}")
         return None, "empty_data"
 
-def parse_and_persist_items(db: Session, user_db_id: int, items: list) -> int:
+def fetch_posts_page(
+    session: requests.Session,
+    profile_id: str,
+    cursor: str = None,
+    username: Optional[str] = None,
+) -> Tuple[Optional[Dict], str]:
+    """
+    Using the stable REST API: GET https://www.instagram.com/api/v1/feed/user/{profile_id}/
+    Transient failures are retried by the shared retry policy (backoff with
+    jitter, "feed" circuit breaker); returns "circuit_open" while it is open.
+    Successful pages are copied to the raw archive.
+    """
+    url = f"https://www.instagram.com/api/v1/feed/user/{profile_id}/"
+    params = {
+        "count": 12,
+    }
+    if cursor:
+        params["max_id"] = cursor
+        
+    logger.info(f"Fetching posts for ID {profile_id} (cursor: {cursor})")
+    page_data, status = call_with_retry("feed", lambda: _fetch_posts_page_once(session, url, params))
+
+    if status == "csrf_rejected":
+        # A rejected token is not a dead session: refresh once and retry
+        if not refresh_csrf_token(session):
+            return None, "session_dead"
+        page_data, status = call_with_retry("feed", lambda: _fetch_posts_page_once(session, url, params))
+        if status == "csrf_rejected":
+            return None, "session_dead"
+
+    if status == "active":
+        archive_payload("feed", page_data, username=username, ig_pk=profile_id, cursor=cursor)
+
+    return page_data, status
+
+def build_post_rows(item: dict, user_db_id: int) -> Optional[Tuple[Dict, list]]:
+    """
+    Maps a v1 feed item to a PostsMetadata row dict and its PostMedia row dicts.
+    Pure function: no DB access. Returns None for items without a shortcode.
+    """
+    shortcode = item.get("code")
+    if not shortcode:
+        return None
+
+    # Determine content kind and container status
+    media_type = item.get("media_type") # 1=Img, 2=Vid, 8=Carousel
+    product_type = item.get("product_type") # 'feed', 'clips', 'carousel_container'
+
+    content_kind = "post"
+    is_container = False
+
+    if media_type == 8:
+        is_container = True
+        content_kind = "post" # Carousels are posts
+    elif media_type == 2:
+        # Video
+        if product_type == "clips":
+            content_kind = "reel"
+        else:
+            content_kind = "post" # Video Post
+    elif media_type == 1:
+        content_kind = "post"
+
+    # Parse fields
+    caption_text = None
+    caption_obj = item.get("caption")
+    if caption_obj:
+        caption_text = caption_obj.get("text")
+
+    timestamp = item.get("taken_at")
+    posted_on = datetime.fromtimestamp(timestamp, UTC) if timestamp else None
+
+    scraped_at = datetime.now(UTC)
+
+    post_row = {
+        "shortcode": shortcode,
+        "posted_by": user_db_id,
+        "content_kind": content_kind,
+        "is_container": is_container,
+        "collaborators": extract_collaborators(item),
+        "caption": caption_text,
+        "likes_count": item.get("like_count"),
+        "comments_count": item.get("comment_count"),
+        "views_count": item.get("view_count") or item.get("play_count"), # view_count for vids
+        "posted_on": posted_on,
+        "scraped_at": scraped_at,
+    }
+
+    media_rows = [
+        {
+            "post_shortcode": shortcode,
+            "media_url": media["media_url"],
+            "media_type": media["media_type"],
+            "media_subtype": media["media_subtype"],
+            "media_index": media["media_index"],
+            "tagged_users": media["tagged_users"],
+            "scraped_at": scraped_at,
+        }
+        for media in extract_media_items(item)
+    ]
+
+    return post_row, media_rows
+
+
+def persist_rows_bulk(db: Session, post_rows: list, media_rows: list, overwrite: bool = False) -> int:
+    """
+    Set-based upsert of a whole page of PostsMetadata and PostMedia rows.
+    Two statements per page instead of one SELECT per post and per slide.
+    overwrite=True also rewrites the insert-only columns (used by replays
+    after an extractor fix). Returns count of new PostsMetadata insertions.
+    """
+    if not post_rows:
+        return 0
+
+    # ON CONFLICT cannot touch the same row twice in one statement: last one wins
+    posts_by_code = {row["shortcode"]: row for row in post_rows}
+    media_by_key = {(row["post_shortcode"], row["media_index"]): row for row in media_rows}
+
+    stmt = pg_insert(PostsMetadata).values(list(posts_by_code.values()))
+    excluded = stmt.excluded
+    update_set = {
+        # collaborators, kind and owner are only written on first insert
+        "caption": excluded.caption,
+        "likes_count": excluded.likes_count,
+        "comments_count": excluded.comments_count,
+        "views_count": func.coalesce(excluded.views_count, PostsMetadata.views_count),
+        "posted_on": func.coalesce(excluded.posted_on, PostsMetadata.posted_on),
+    }
+    if overwrite:
+        update_set.update({
+            "content_kind": excluded.content_kind,
+            "is_container": excluded.is_container,
+            "collaborators": excluded.collaborators,
+        })
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PostsMetadata.shortcode],
+        set_=update_set,
+    ).returning(
+        PostsMetadata.shortcode,
+        # xmax is 0 only for rows created by this statement (not updated ones)
+        literal_column("(xmax = 0)").label("inserted"),
+    )
+    count_new = sum(1 for row in db.execute(stmt) if row.inserted)
+
+    if media_by_key:
+        media_stmt = pg_insert(PostMedia).values(list(media_by_key.values()))
+        media_excluded = media_stmt.excluded
+        media_stmt = media_stmt.on_conflict_do_update(
+            constraint="uq_post_media_index",
+            set_={
+                # update mutable fields on re-scrape
+                "media_url": media_excluded.media_url,
+                "media_type": media_excluded.media_type,
+                "media_subtype": media_excluded.media_subtype,
+                "tagged_users": media_excluded.tagged_users,
+            },
+        )
+        db.execute(media_stmt)
+
+    return count_new
+
+
+def parse_and_persist_items(db: Session, user_db_id: int, items: list, bulk: bool = True) -> int:
     """
     Parses items from v1 feed and persists to PostsMetadata.
+    bulk=True upserts the whole page with INSERT ... ON CONFLICT;
+    bulk=False keeps the per-item SELECT path.
     Returns count of new insertions.
     """
-    count_new = 0
-    
+    post_rows = []
+    media_rows = []
+
     for item in items:
         try:
-            shortcode = item.get("code")
-            if not shortcode:
-                continue
-
-            # Determine content kind and container status
-            media_type = item.get("media_type") # 1=Img, 2=Vid, 8=Carousel
-            product_type = item.get("product_type") # 'feed', 'clips', 'carousel_container'
-            
-            content_kind = "post"
-            is_container = False
-            
-            if media_type == 8:
-                is_container = True
-                content_kind = "post" # Carousels are posts
-            elif media_type == 2:
-                # Video
-                if product_type == "clips":
-                    content_kind = "reel"
-                else:
-                    content_kind = "post" # Video Post
-            elif media_type == 1:
-                content_kind = "post"
-                
-            # Parse fields
-            caption_text = None
-            caption_obj = item.get("caption")
-            if caption_obj:
-                caption_text = caption_obj.get("text")
-                
-            timestamp = item.get("taken_at")
-            posted_on = datetime.fromtimestamp(timestamp, UTC) if timestamp else None
-            
-            likes_count = item.get("like_count")
-            comments_count = item.get("comment_count")
-            views_count = item.get("view_count") or item.get("play_count") # view_count for vids
+            rows = build_post_rows(item, user_db_id)
+            if rows:
+                post_rows.append(rows[0])
+                media_rows.extend(rows[1])
+        except Exception as e:
+            logger.error(f"Error parsing item {item.get('code', 'unknown')}: {e}")
+            continue
 
+    if bulk:
+        count_new = persist_rows_bulk(db, post_rows, media_rows)
+        db.commit()
+        return count_new
 
-            # Extract collaborators
-            collaborators_extracted = extract_collaborators(item)
+    count_new = 0
+    media_by_code: Dict[str, list] = {}
+    for media in media_rows:
+        media_by_code.setdefault(media["post_shortcode"], []).append(media)
 
-            # Extract media items
-            media_items = extract_media_items(item)
-            
+    for row in post_rows:
+        shortcode = row["shortcode"]
+        try:
             # Check existing
             post = db.query(PostsMetadata).filter_by(shortcode=shortcode).first()
             if not post:
                 post = PostsMetadata(
                     shortcode=shortcode,
-                    posted_by=user_db_id,
-                    content_kind=content_kind,
-                    is_container=is_container,
-                    collaborators=json.dumps(collaborators_extracted),
-                    scraped_at=datetime.now(UTC),
+                    posted_by=row["posted_by"],
+                    content_kind=row["content_kind"],
+                    is_container=row["is_container"],
+                    collaborators=row["collaborators"],
+                    scraped_at=row["scraped_at"],
                 )
                 db.add(post)
                 count_new += 1
-            
-            # Update mutable fields
-            post.caption = caption_text
-            post.likes_count = likes_count
-            post.comments_count = comments_count
-            if views_count is not None:
-                post.views_count = views_count
-            if posted_on:
-                post.posted_on = posted_on
-                
-            # If we wanted to parse media items (slides/URLs), we would do it here using PostMedia table.
-            # For now, focusing on Metadata as per initial requirement/snippet.
 
-            for media in media_items:
+            # Update mutable fields
+            post.caption = row["caption"]
+            post.likes_count = row["likes_count"]
+            post.comments_count = row["comments_count"]
+            if row["views_count"] is not None:
+                post.views_count = row["views_count"]
+            if row["posted_on"]:
+                post.posted_on = row["posted_on"]
+
+            for media in media_by_code.get(shortcode, []):
                 existing_media = (
                     db.query(PostMedia)
                     .filter_by(
@@ -360,32 +459,171 @@ def parse_and_persist_items(db: Session, user_db_id: int, items: list) -> int:
                 )
 
                 if not existing_media:
-                    existing_media = PostMedia(
-                        post_shortcode=shortcode,
-                        media_url=media["media_url"],
-                        media_type=media["media_type"],
-                        media_subtype=media["media_subtype"],
-                        media_index=media["media_index"],
-                        tagged_users=json.dumps(media["tagged_users"]),
-                        scraped_at=datetime.now(UTC),
-                    )
+                    existing_media = PostMedia(**media)
                     db.add(existing_media)
                 else:
                     # update mutable fields on re-scrape
                     existing_media.media_url = media["media_url"]
                     existing_media.media_type = media["media_type"]
                     existing_media.media_subtype = media["media_subtype"]
-                    existing_media.tagged_users = json.dumps(media["tagged_users"])
-            
+                    existing_media.tagged_users = media["tagged_users"]
+
         except Exception as e:
-            logger.error(f"Error parsing item {item.get('code', 'unknown')}: {e}")
+            logger.error(f"Error persisting item {shortcode}: {e}")
             continue
 
     db.commit()
     return count_new
 
-def seed_posts_for_user(db: Session, session: requests.Session, username: str):
-    logger.info(f"=== Seeding posts for {username} ===")
+@dataclass
+class StageStats:
+    """
+    Busy/idle wall time of one pipeline stage.
+    Busy = doing work, idle = waiting on the queue or on pacing.
+    """
+    name: str
+    busy_seconds: float = 0.0
+    idle_seconds: float = 0.0
+    pages: int = 0
+
+    def add_busy(self, seconds: float) -> None:
+        self.busy_seconds += seconds
+        self.pages += 1
+
+    def add_idle(self, seconds: float) -> None:
+        self.idle_seconds += seconds
+
+    def __str__(self) -> str:
+        total = self.busy_seconds + self.idle_seconds
+        utilization = (self.busy_seconds / total * 100) if total else 0.0
+        return (
+            f"{self.name}: pages={self.pages} busy={self.busy_seconds:.1f}s "
+            f"idle={self.idle_seconds:.1f}s ({utilization:.0f}% busy)"
+        )
+
+
+def _put_page(pages: queue.Queue, message, stop_event: threading.Event, stats: StageStats) -> bool:
+    """
+    Blocking put that gives up when the consumer has stopped.
+    Returns False if the message was dropped.
+    """
+    waited_at = time.monotonic()
+    try:
+        while not stop_event.is_set():
+            try:
+                pages.put(message, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    finally:
+        stats.add_idle(time.monotonic() - waited_at)
+
+
+def fetch_pages(
+    session: requests.Session,
+    username: str,
+    profile_id: str,
+    cursor: Optional[str],
+    page_num: int,
+    pages: queue.Queue,
+    stop_event: threading.Event,
+    stats: StageStats,
+    go_ahead: Optional[threading.Semaphore] = None,
+) -> None:
+    """
+    Fetch stage of the posts pipeline. Paginates the feed and hands
+    (page_num, page_data, status) tuples to the persist stage, so page N is
+    written while page N+1 waits on the request governor and is fetched.
+    With go_ahead (incremental seeds) each page first takes a permit the
+    persist stage releases once it knows it wants the next page, so no
+    request is spent past the page where the seed stops.
+    Always ends with a None.
+    """
+    rate_limit_retries = 0
+    try:
+        while not stop_event.is_set():
+            if go_ahead is not None and not rate_limit_retries:
+                waited_at = time.monotonic()
+                while not go_ahead.acquire(timeout=1):
+                    if stop_event.is_set():
+                        return
+                stats.add_idle(time.monotonic() - waited_at)
+
+            # Pacing comes from the request governor; wait here so a stop is noticed
+            waited_at = time.monotonic()
+            if not governor.wait_available(stop_event):
+                return
+            stats.add_idle(time.monotonic() - waited_at)
+
+            started_at = time.monotonic()
+            page_data, status = fetch_posts_page(session, profile_id, cursor, username=username)
+            stats.add_busy(time.monotonic() - started_at)
+
+            if status == "rate_limited":
+                rate_limit_retries += 1
+                if rate_limit_retries <= settings.IG_MAX_RATE_LIMIT_RETRIES:
+                    # The rate controller already lowered the rate and paused the
+                    # governor (Retry-After aware); the next wait_available honors it
+                    logger.warning(
+                        f"Rate limited while fetching page {page_num} "
+                        f"({rate_limit_retries}/{settings.IG_MAX_RATE_LIMIT_RETRIES}). "
+                        f"Controller state: {rate_controller.snapshot()}"
+                    )
+                    # Retry the current page
+                    continue
+            else:
+                rate_limit_retries = 0
+
+            if not _put_page(pages, (page_num, page_data, status), stop_event, stats):
+                return
+
+            if status != "active" or not page_data or not page_data.get("more_available", False):
+                return
+
+            cursor = page_data.get("next_max_id")
+            page_num += 1
+
+            # Picks up a refreshed login; only hits the homepage when the
+            # CSRF token is missing, rejected or about to expire
+            session_manager.ensure_fresh_csrf(session)
+    except Exception as e:
+        logger.error(f"Fetch stage failed for ID {profile_id}: {e}")
+        _put_page(pages, (page_num, None, "error"), stop_event, stats)
+    finally:
+        _put_page(pages, None, stop_event, stats)
+
+
+def fetch_known_shortcodes(db: Session, shortcodes: list) -> set:
+    """
+    Returns the subset of shortcodes already stored in posts_metadata.
+    One query per page.
+    """
+    if not shortcodes:
+        return set()
+    rows = (
+        db.query(PostsMetadata.shortcode)
+        .filter(PostsMetadata.shortcode.in_(shortcodes))
+        .all()
+    )
+    return {row.shortcode for row in rows}
+
+
+def seed_posts_for_user(
+    db: Session,
+    session: requests.Session,
+    username: str,
+    incremental: Optional[bool] = None,
+):
+    """
+    Paginates the v1 feed of a user and persists every page.
+    incremental=True stops once POSTS_INCREMENTAL_STOP_AFTER consecutive posts
+    are already stored; the page containing them is still upserted so
+    engagement counts on the overlap window are refreshed.
+    """
+    if incremental is None:
+        incremental = settings.POSTS_SEED_INCREMENTAL
+    logger.info(f"=== Seeding posts for {username} (incremental={incremental}) ===")
     
     # Get the related ScrapeJob for this user
     scrape_job = (
@@ -403,8 +641,12 @@ def seed_posts_for_user(db: Session, session: requests.Session, username: str):
         db.commit()
         logger.info(f"Updated job {scrape_job.id} to POSTS_SEED_RUNNING")
     
-    # Resolve IG PK
-    profile_id, status = resolve_profile_id(session, username)
+    # Resolve IG PK, only on a cache / users.ig_pk miss
+    profile_id = get_known_profile_id(db, username)
+    status = "active"
+    if not profile_id:
+        profile_id, status = resolve_profile_id(session, username)
+        remember_profile_id(db, username, profile_id)
     if status == "session_dead":
         error_msg = f"Session died during profile ID resolution for user: {username}"
         logger.critical(error_msg)
@@ -417,87 +659,131 @@ def seed_posts_for_user(db: Session, session: requests.Session, username: str):
             scrape_job.status = ScrapeJobStatus.POSTS_SEEDED_FAILED
             scrape_job.last_error = "Session dead during profile ID resolution"
             db.commit()
-        raise RuntimeError("Session Dead")
+        raise JobFailure("Session Dead", "session_dead")
     
+    # Failures are raised, so the caller schedules a retry (or DEAD) for the job
     if not profile_id:
-        logger.error(f"Could not resolve profile ID for {username}. Skipping.")
-        if scrape_job:
-            scrape_job.status = ScrapeJobStatus.POSTS_SEEDED_FAILED
-            scrape_job.last_error = "Could not resolve profile ID"
-            db.commit()
-        return
+        logger.error(f"Could not resolve profile ID for {username} (status: {status}).")
+        raise JobFailure(f"Could not resolve profile ID: {status}", status)
 
     # Get DB user
     user_db = db.query(User).filter_by(username=username).first()
     if not user_db:
-        logger.error(f"User {username} not in DB. Skipping.")
-        if scrape_job:
-            scrape_job.status = ScrapeJobStatus.POSTS_SEEDED_FAILED
-            scrape_job.last_error = f"User {username} not found in database"
-            db.commit()
-        return
+        logger.error(f"User {username} not in DB.")
+        raise RuntimeError(f"User {username} not found in database")
 
     # Pagination
     cursor = None
-    has_next_page = True
     total_discovered = 0
     page_num = 1
-    pages_processed = 0
-    
-    while has_next_page:
-        page_data, status = fetch_posts_page(session, profile_id, cursor)
-        
-        if status == "session_dead":
-            error_msg = f"Session died during pagination for user: {username}"
-            logger.critical(error_msg)
-            send_alert_email(
-                subject="Session Dead - Posts Pagination",
-                body=f"<strong>Username:</strong> {username}<br><strong>Page:</strong> {page_num}<br><strong>Total Posts Discovered:</strong> {total_discovered}<br><strong>Error:</strong> {error_msg}",
-                error_details=f"Session became invalid while paginating through posts. Progress was lost at page {page_num} with {total_discovered} posts already discovered."
-            )
+    known_run = 0
+
+    # Resume from the last committed page of a previous, interrupted run
+    if scrape_job and scrape_job.checkpoint_cursor:
+        cursor = scrape_job.checkpoint_cursor
+        page_num = scrape_job.checkpoint_page or 1
+        total_discovered = scrape_job.checkpoint_discovered or 0
+        logger.info(f"Resuming {username} from checkpoint: page {page_num}, {total_discovered} posts already discovered")
+
+    # Fetch stage runs in its own thread; this thread parses and persists
+    pages: queue.Queue = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    stop_event = threading.Event()
+    fetch_stats = StageStats("fetch")
+    persist_stats = StageStats("persist")
+    # Incremental seeds usually stop on page 1: fetch one page ahead only on request
+    go_ahead = threading.Semaphore(1) if incremental else None
+    fetcher = threading.Thread(
+        target=fetch_pages,
+        args=(session, username, profile_id, cursor, page_num, pages, stop_event, fetch_stats, go_ahead),
+        name=f"fetch-{username}",
+        daemon=True,
+    )
+    fetcher.start()
+
+    try:
+        while True:
+            waited_at = time.monotonic()
+            message = pages.get()
+            persist_stats.add_idle(time.monotonic() - waited_at)
+            if message is None:
+                break
+
+            page_num, page_data, status = message
+            started_at = time.monotonic()
+
+            if status == "session_dead":
+                error_msg = f"Session died during pagination for user: {username}"
+                logger.critical(error_msg)
+                send_alert_email(
+                    subject="Session Dead - Posts Pagination",
+                    body=f"<strong>Username:</strong> {username}<br><strong>Page:</strong> {page_num}<br><strong>Total Posts Discovered:</strong> {total_discovered}<br><strong>Error:</strong> {error_msg}",
+                    error_details=f"Session became invalid while paginating through posts. Progress is checkpointed: the job will resume at page {page_num} with {total_discovered} posts already discovered."
+                )
+                if scrape_job:
+                    scrape_job.status = ScrapeJobStatus.POSTS_SEEDED_FAILED
+                    scrape_job.last_error = "Session died during pagination"
+                    db.commit()
+                raise JobFailure("Session Dead", "session_dead")
+
+            if status != "active":
+                # Keep the checkpoint: a retried job resumes from this page
+                logger.warning(f"Fetch failed for {username} page {page_num} (status: {status}).")
+                if scrape_job:
+                    scrape_job.status = ScrapeJobStatus.POSTS_SEEDED_FAILED
+                    scrape_job.last_error = f"Pagination failed at page {page_num}: {status}"
+                    db.commit()
+                raise JobFailure(f"Pagination failed: {status}", status)
+
+            if not page_data or "items" not in page_data:
+                logger.warning(f"No items for {username} page {page_num}. Ending.")
+                break
+
+            items = page_data.get("items", [])
+
+            if incremental:
+                # Must be checked before persisting, otherwise every post is "known"
+                shortcodes = [item.get("code") for item in items if item.get("code")]
+                known = fetch_known_shortcodes(db, shortcodes)
+                for shortcode in shortcodes:
+                    # Pinned posts can be known while newer ones are not: only a run counts
+                    known_run = known_run + 1 if shortcode in known else 0
+                    if known_run >= settings.POSTS_INCREMENTAL_STOP_AFTER:
+                        break
+                if known_run < settings.POSTS_INCREMENTAL_STOP_AFTER:
+                    # Next page is wanted: its request overlaps this page's writes
+                    go_ahead.release()
+
+            # Checkpoint rides on the same commit as the page's rows
             if scrape_job:
-                scrape_job.status = ScrapeJobStatus.POSTS_SEEDED_FAILED
-                scrape_job.last_error = "Session died during pagination"
-                db.commit()
-            raise RuntimeError("Session Dead")
-        
-        if status == "rate_limited":
-            logger.warning(f"Rate limited while scraping {username}. Backing off for 60 seconds...")
-            time.sleep(60)
-            # Retry the current page
-            continue
-        
-        if not page_data or "items" not in page_data:
-            logger.warning(f"No items or error for {username} page {page_num}. Ending.")
-            break
-            
-        items = page_data.get("items", [])
-        new_count = parse_and_persist_items(db, user_db.id, items)
-        
-        total_discovered += len(items)
-        logger.info(f"Page {page_num}: Found {len(items)} items ({new_count} new). Total so far: {total_discovered}")
-        
-        has_next_page = page_data.get("more_available", False)
-        cursor = page_data.get("next_max_id")
-        page_num += 1
-        pages_processed += 1
-        
-        if has_next_page:
-            # Adaptive delay: longer between pages to avoid detection
-            sleep_time = get_random_delay(min_seconds=25, max_seconds=45)
-            logger.info(f"Sleeping {sleep_time:.1f}s before next page...")
-            time.sleep(sleep_time)
-            
-            # Refresh CSRF token every 5 pages to prevent expiry
-            if pages_processed % 5 == 0:
-                logger.info("Refreshing CSRF token as precaution...")
-                refresh_csrf_token(session)
+                scrape_job.checkpoint_cursor = page_data.get("next_max_id")
+                scrape_job.checkpoint_page = page_num + 1
+                scrape_job.checkpoint_discovered = total_discovered + len(items)
+
+            new_count = parse_and_persist_items(db, user_db.id, items)
+
+            total_discovered += len(items)
+            logger.info(f"Page {page_num}: Found {len(items)} items ({new_count} new). Total so far: {total_discovered}")
+            persist_stats.add_busy(time.monotonic() - started_at)
+
+            if incremental and known_run >= settings.POSTS_INCREMENTAL_STOP_AFTER:
+                logger.info(f"Reached {known_run} already-stored posts for {username}. Stopping incremental seed.")
+                break
+    finally:
+        # Unblocks the fetch stage whether we finished, stopped early or failed
+        stop_event.set()
+        fetcher.join(timeout=PIPELINE_JOIN_TIMEOUT)
+        logger.info(f"Pipeline stats for {username}: {fetch_stats} | {persist_stats}")
+        logger.info(f"Rate controller state: {rate_controller.snapshot()}")
+        logger.info(f"Retry stats: {retry_stats.snapshot()} circuits: {breaker_states()}")
 
     logger.info(f"Finished {username}. Total posts processed: {total_discovered}")
     
     # Update job status to POSTS_SEEDED on success
     if scrape_job:
         scrape_job.status = ScrapeJobStatus.POSTS_SEEDED
+        scrape_job.checkpoint_cursor = None
+        scrape_job.checkpoint_page = None
+        scrape_job.checkpoint_discovered = 0
         db.commit()
         logger.info(f"Updated job {scrape_job.id} to POSTS_SEEDED")
 
@@ -505,12 +791,26 @@ def seed_posts_for_user(db: Session, session: requests.Session, username: str):
 
 
 
-def run_worker():
+def estimate_user_requests(user: User) -> int:
+    """
+    Requests a full post seed of this user is expected to cost:
+    one per feed page, plus profile-ID resolution when the PK is unknown.
+    """
+    pages = -(-(user.posts_count or 0) // 12) or 1
+    resolution = 0 if user.ig_pk else 1
+    return pages + resolution
+
+
+def run_worker(follow: bool = False):
+    """
+    Seeds posts for USER_SEEDED profiles until none are left. With
+    follow=True it stays up and waits for NOTIFY from the profile stage.
+    """
     db = SessionLocal()
 
-    # 1. Build authenticated session ONCE
+    # 1. Process-wide authenticated session (built once, hot-reloads cookies)
     try:
-        session = build_authenticated_session()
+        session = get_session()
     except Exception as e:
         logger.critical(f"Failed to build authenticated session: {e}")
         db.close()
@@ -520,76 +820,93 @@ def run_worker():
     # users = db.query(User).all()
 
 
-    # Load the records in scrape_jobs where job_type=PROFILE and status=USER_SEEDED
+    # Crashed runs come back via their expired lease and failed ones on their
+    # scheduled retry; both resume from the checkpoint. Failures left over
+    # from before retry scheduling are requeued once per start.
+    reap_expired_leases(db)
+    requeue_checkpointed(db, POSTS_STAGE)
+
+    # Profiles with status=USER_SEEDED, waiting for their posts
     users = (
         db.query(User)
         .join(
             ScrapeJob,
             (ScrapeJob.entity_key == User.username) &
-            (ScrapeJob.job_type == ScrapeJobType.PROFILE) &
-            (ScrapeJob.status == ScrapeJobStatus.USER_SEEDED)
+            (ScrapeJob.job_type == POSTS_STAGE.job_type) &
+            (ScrapeJob.status == POSTS_STAGE.ready)
         )
         .all()
     )
 
     logger.info(f"Found {len(users)} users in DB to process.")
 
-    for i, user in enumerate(users):
-        scrape_job = None
+    # Plan against the request budget: ~1 request per feed page plus resolution.
+    # The governor holds this process's share; IG_INSTANCES workers drain the
+    # same queue, each at its own share.
+    planned_requests = sum(estimate_user_requests(user) for user in users)
+    instances = max(1, settings.IG_INSTANCES)
+    logger.info(
+        f"Planned ~{planned_requests} Instagram requests at {governor.requests_per_hour:.0f}/hour per process "
+        f"({instances} instances): estimated {governor.estimate_seconds(planned_requests) / instances / 3600:.1f}h"
+    )
+
+    listener = JobListener(POSTS_STAGE.name) if follow else None
+
+    while True:
+        # Leased and already marked POSTS_SEED_RUNNING; safe with N instances
+        scrape_job = claim_next(db, POSTS_STAGE)
+        if not scrape_job:
+            if not follow:
+                break
+            listener.wait(settings.JOB_POLL_FALLBACK_SECONDS)
+            reap_expired_leases(db)
+            continue
+        username = scrape_job.entity_key
+
         try:
-            # Get the job before processing
-            scrape_job = (
-                db.query(ScrapeJob)
-                .filter(
-                    ScrapeJob.job_type == ScrapeJobType.PROFILE,
-                    ScrapeJob.entity_key == user.username
-                )
-                .first()
-            )
-            
-            seed_posts_for_user(db, session, user.username)
+            with LeaseHeartbeat(scrape_job.id):
+                seed_posts_for_user(db, session, username)
+
+            # seed_posts_for_user has already written the outcome
+            finish_job(db, scrape_job)
 
         except RuntimeError as e:
             # Hard stop condition (checkpoint / login required)
             db.rollback()
-            if "Session Dead" in str(e):
+            if classify_failure(e) == "session_dead":
+                # Not the profile's fault: requeued without spending an attempt
+                fail_job(db, POSTS_STAGE, scrape_job, e)
                 error_msg = "Session marked dead. Stopping Instagram scraper worker immediately."
                 logger.critical(error_msg)
                 send_alert_email(
                     subject="Worker Stopped - Session Dead",
-                    body=f"<strong>Current User:</strong> {user.username}<br><strong>Error:</strong> {error_msg}",
+                    body=f"<strong>Current User:</strong> {username}<br><strong>Error:</strong> {error_msg}",
                     error_details="The authenticated Instagram session has died and cannot continue. The worker has stopped to prevent further failures. Manual re-authentication may be required."
                 )
                 break
 
             logger.error(
-                f"Runtime error processing {user.username}: {e}"
+                f"Runtime error processing {username}: {e}"
             )
-            if scrape_job:
-                scrape_job.status = ScrapeJobStatus.POSTS_SEEDED_FAILED
-                scrape_job.last_error = str(e)
-                db.commit()
+            fail_job(db, POSTS_STAGE, scrape_job, e)
 
         except Exception as e:
             # Any DB / parsing / persistence error
             db.rollback()
             logger.error(
-                f"Unexpected error processing {user.username}: {e}"
+                f"Unexpected error processing {username}: {e}"
             )
             traceback.print_exc()
-            if scrape_job:
-                scrape_job.status = ScrapeJobStatus.POSTS_SEEDED_FAILED
-                scrape_job.last_error = str(e)[:500]  # Truncate to avoid too long errors
-                db.commit()
-
-        # Controlled pacing between users (longer delay between different users)
-        if i < len(users) - 1:
-            sleep_time = get_random_delay(min_seconds=60, max_seconds=180)  # Longer delay between users: 1-3 minutes
-            logger.info(f"Sleeping {sleep_time:.1f}s before next user...")
-            time.sleep(sleep_time)
+            fail_job(db, POSTS_STAGE, scrape_job, e)
 
+    if listener:
+        listener.close()
     db.close()
     logger.info("GraphQL post seeding worker finished.")
 
 if __name__ == "__main__":
-    run_worker()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Seed posts for USER_SEEDED profiles.")
+    parser.add_argument("--follow", action="store_true", help="keep running and wait for new jobs")
+    run_worker(follow=parser.parse_args().follow)
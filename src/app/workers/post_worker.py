@@ -1,20 +1,24 @@
+from typing import Iterable
+
 from src.app.core.db.models import ScrapeJobSource
-from sqlalchemy.exc import IntegrityError
-from src.app.core.db.models import ScrapeJob, ScrapeJobStatus, ScrapeJobType
+from src.app.core.db.models import ScrapeJobType
 from sqlalchemy.orm import Session
 from src.app.core.logging_config import logger
+from src.app.jobs.enqueue import EnqueueResult, enqueue_jobs
+
+
+def enqueue_profile_jobs(usernames: Iterable[str], db: Session) -> EnqueueResult:
+    """
+    Follow-up PROFILE jobs for usernames found in posts, in one statement.
+    Jobs and the wake-up are delivered with the caller's commit.
+    """
+    result = enqueue_jobs(db, ScrapeJobType.PROFILE, usernames, ScrapeJobSource.FOLLOWUP)
+    logger.info(f"Enqueued profile jobs: {result}")
+    return result
 
 
-def enqueue_profile_job(username: str, db: Session):
-    job = ScrapeJob(
-        job_type=ScrapeJobType.PROFILE,
-        entity_key=username,
-        status=ScrapeJobStatus.PENDING,
-        source=ScrapeJobSource.FOLLOWUP
-    )
-    try:
-        db.add(job)
-        logger.info(f"Enqueued profile job for username: {username}")
-    except IntegrityError as e:
-        logger.info(f"Profile job for username: {username} already exists")
-        db.rollback() 
+def enqueue_profile_job(username: str, db: Session) -> bool:
+    """
+    Returns False if a profile job for username already exists.
+    """
+    return enqueue_profile_jobs([username], db).inserted == 1
@@ -1,22 +1,21 @@
 
 from src.app.core.logging_config import logger
 
-from src.app.instagram.client import build_authenticated_session
+from src.app.instagram.session_manager import get_session
 from src.app.instagram.resolve_username import resolve_username
-from src.app.workers.profile_worker import fetch_profile_webinfo
+from src.app.workers.profile_worker import apply_profile_data, fetch_profile_webinfo
 from src.app.workers.profile_worker import process_user_links
 from src.app.workers.post_seed_worker import seed_posts_for_user
 from src.app.core.db.models import ScrapeJobStatus,ScrapeJob
 from src.app.core.db.models import User
 from src.app.core.db.session import SessionLocal
 from sqlalchemy.orm import Session
-from src.app.services.extractors import extract_contacts
 
 
 
 
 def process_scrape_job(job: ScrapeJob, db: Session) -> None:
-    session = build_authenticated_session()
+    session = get_session()
 
     try:
         # -------------------------
@@ -39,16 +38,7 @@ def process_scrape_job(job: ScrapeJob, db: Session) -> None:
             db.add(user)
             db.flush()
 
-        extracted = extract_contacts(data.get("biography", ""))
-
-        user.display_name = data.get("full_name")
-        user.bio_text = extracted["bio"]
-        user.email = extracted["email"]
-        user.phone_number = extracted["phone"]
-        user.followers_count = data["edge_followed_by"]["count"]
-        user.following_count = data["edge_follow"]["count"]
-        user.posts_count = data["edge_owner_to_timeline_media"]["count"]
-        user.is_verified = data.get("is_verified", False)
+        apply_profile_data(user, data)
 
         db.commit()
         job.status = ScrapeJobStatus.USER_SEEDED
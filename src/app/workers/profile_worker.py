@@ -4,29 +4,71 @@ from sqlalchemy.exc import IntegrityError
 from src.app.core.db.models import User
 from src.app.core.db.models import ScrapeJob, ScrapeJobStatus, ScrapeJobType, ScrapeJobSource
 from src.app.core.logging_config import logger
+import asyncio
 import requests
-from src.app.instagram.client import build_authenticated_session
+from typing import List, Optional, Tuple, Union
+from src.app.instagram.client import classify_feed_status
+from src.app.instagram.session_manager import get_session
+from src.app.instagram.retry import call_with_retry
+from src.app.instagram.archive import archive_payload
+from src.app.instagram.async_client import close_async_client, fetch_profile_webinfos
 from src.app.services.extractors import process_user_links,extract_contacts
+from src.app.instagram.profile_ids import profile_id_cache
+from src.app.core.config import settings
+from src.app.jobs.notify import JobListener
+from src.app.jobs.queue import (
+    PROFILE_STAGE,
+    JobFailure,
+    LeaseHeartbeat,
+    claim_batch,
+    claim_next,
+    classify_failure,
+    fail_job,
+    finish_job,
+    reap_expired_leases,
+)
+
+
+def _fetch_profile_webinfo_once(session: requests.Session, username: str) -> Tuple[Optional[requests.Response], str]:
+    try:
+        resp = session.get(
+            "https://www.instagram.com/api/v1/users/web_profile_info/",
+            params={"username": username},
+            headers={
+                "Accept": "application/json",
+                "X-IG-App-ID": "936619743392459",
+                "Referer": f"https://www.instagram.com/{username}/",
+            },
+            timeout=(5, 10),
+        )
+    except requests.exceptions.Timeout:
+        return None, "timeout"
+    except requests.exceptions.ConnectionError:
+        return None, "connection_error"
+
+    if resp.status_code == 200:
+        return resp, "active"
+    return resp, classify_feed_status(resp.status_code) or "error"
 
 
 def fetch_profile_webinfo(session: requests.Session, username: str) -> dict:
-    resp = session.get(
-        "https://www.instagram.com/api/v1/users/web_profile_info/",
-        params={"username": username},
-        headers={
-            "Accept": "application/json",
-            "X-IG-App-ID": "936619743392459",
-            "Referer": f"https://www.instagram.com/{username}/",
-        },
-        timeout=(5, 10),
+    resp, status = call_with_retry(
+        "web_profile_info",
+        lambda: _fetch_profile_webinfo_once(session, username),
     )
 
-    if resp.status_code != 200:
-        raise RuntimeError(
-            f"IG webinfo failed status={resp.status_code} body={resp.text[:200]}"
+    if status != "active":
+        if resp is None:
+            raise JobFailure(f"IG webinfo failed status={status}", status)
+        raise JobFailure(
+            f"IG webinfo failed status={resp.status_code} body={resp.text[:200]}",
+            status,
         )
 
-    return resp.json()["data"]["user"]
+    payload = resp.json()
+    user = payload["data"]["user"]
+    archive_payload("web_profile_info", payload, username=username, ig_pk=user.get("id"))
+    return user
 
 
 def process_profile_job(
@@ -34,12 +76,20 @@ def process_profile_job(
     db: Session,
 ) -> None:
     username = job.entity_key
-    profile_url = f"https://www.instagram.com/{username}"
 
     logger.info("Seeding profile %s", username)
 
-    session = build_authenticated_session()
+    session = get_session()
     data = fetch_profile_webinfo(session, username)
+    persist_profile(db, username, data)
+
+
+def persist_profile(db: Session, username: str, data: dict) -> None:
+    """
+    Stores a fetched web_profile_info user payload, then runs the link
+    enrichment. Shared by the blocking and the concurrent loop.
+    """
+    profile_url = f"https://www.instagram.com/{username}"
 
     user = db.query(User).filter_by(username=username).first()
     if not user:
@@ -47,6 +97,27 @@ def process_profile_job(
         db.add(user)
         db.flush()  # ensures user.id exists
 
+    apply_profile_data(user, data)
+
+    # persist profile state first
+    db.commit()
+
+    # enrichment phase: must never fail the profile job
+    try:
+        process_user_links(username, db)
+    except Exception as e:
+        logger.warning(
+            "Aggregator expansion failed for username=%s: %s",
+            username,
+            e,
+        )
+
+
+def apply_profile_data(user: User, data: dict) -> None:
+    """
+    Copies a web_profile_info user payload onto a User row. No DB access,
+    so the replay worker can run it over archived payloads.
+    """
     user.display_name = data.get("full_name")
 
     bio_text = data.get("biography", "")
@@ -60,63 +131,110 @@ def process_profile_job(
     user.following_count = data["edge_follow"]["count"]
     user.posts_count = data["edge_owner_to_timeline_media"]["count"]
     user.is_verified = data.get("is_verified", False)
-    user.profile_url = profile_url
+    if data.get("id"):
+        user.ig_pk = str(data["id"])
+        profile_id_cache.put(user.username, user.ig_pk)
+    user.profile_url = f"https://www.instagram.com/{user.username}"
 
-    # persist profile state first
-    db.commit()
 
-    # enrichment phase: must never fail the profile job
+
+
+def _run_profile_job(db: Session, job: ScrapeJob, data: Union[dict, Exception, None]) -> bool:
+    """
+    Seeds one leased profile job and records its outcome. data is the
+    payload the concurrent loop already fetched (or the exception fetching
+    it raised); None fetches it here. Returns False if the session died.
+    """
     try:
-        process_user_links(username, db)
+        if isinstance(data, Exception):
+            raise data
+        if data is None:
+            process_profile_job(job, db)
+        else:
+            persist_profile(db, job.entity_key, data)
+
+        finish_job(db, job, PROFILE_STAGE.done)
+
     except Exception as e:
-        logger.warning(
-            "Aggregator expansion failed for username=%s: %s",
-            username,
+        db.rollback()
+        # Retried later with backoff, or DEAD after JOB_MAX_ATTEMPTS
+        fail_job(db, PROFILE_STAGE, job, e)
+        logger.error(
+            "Job id=%s username=%s failed: %s",
+            job.id,
+            job.entity_key,
             e,
         )
+        return classify_failure(e) != "session_dead"
 
+    return True
 
 
-
-if __name__ == "__main__":
+def run_worker(follow: bool = False, concurrency: int = 1) -> None:
+    """
+    Claims PENDING profile jobs until none are left. With follow=True it
+    stays up and waits for NOTIFY from enqueue_profile_job instead of exiting.
+    With concurrency > 1 it leases that many jobs at a time and fetches
+    their profiles concurrently over the async client; the governor still
+    paces every request.
+    """
     from src.app.core.db.session import SessionLocal
 
     db = SessionLocal()
+    reap_expired_leases(db)
+    listener = JobListener(PROFILE_STAGE.name) if follow else None
+    loop = asyncio.new_event_loop() if concurrency > 1 else None
 
-    while True:
-        job = (
-            db.query(ScrapeJob)
-            .filter(
-                ScrapeJob.job_type == ScrapeJobType.PROFILE,
-                ScrapeJob.status == ScrapeJobStatus.PENDING,
-            )
-            .order_by(ScrapeJob.id.asc())
-            .first()
-        )
-
-        if not job:
-            logger.info("No pending PROFILE jobs left. Exiting.")
-            break
-
-        logger.info("Picked job id=%s username=%s", job.id, job.entity_key)
-
-        job.status = ScrapeJobStatus.USER_SEED_RUNNING
-        db.commit()
-
-        try:
-            process_profile_job(job, db)
-
-            job.status = ScrapeJobStatus.USER_SEEDED        
-            db.commit()
+    try:
+        while True:
+            # Leased and already marked USER_SEED_RUNNING; safe with N instances
+            if loop:
+                jobs: List[ScrapeJob] = claim_batch(db, PROFILE_STAGE, concurrency)
+            else:
+                job = claim_next(db, PROFILE_STAGE)
+                jobs = [job] if job else []
+
+            if not jobs:
+                if not follow:
+                    logger.info("No pending PROFILE jobs left. Exiting.")
+                    break
+                listener.wait(settings.JOB_POLL_FALLBACK_SECONDS)
+                reap_expired_leases(db)
+                continue
+
+            logger.info("Picked jobs ids=%s usernames=%s", [job.id for job in jobs], [job.entity_key for job in jobs])
+
+            with LeaseHeartbeat([job.id for job in jobs]):
+                if loop:
+                    payloads = loop.run_until_complete(fetch_profile_webinfos([job.entity_key for job in jobs]))
+                else:
+                    payloads = [None]
+                # Every request of the batch is already out: record them all before stopping
+                alive = [_run_profile_job(db, job, data) for job, data in zip(jobs, payloads)]
+
+            if not all(alive):
+                # Every further job would fail the same way
+                logger.critical("Session marked dead. Stopping profile worker.")
+                break
+    finally:
+        if loop:
+            loop.run_until_complete(close_async_client())
+            loop.close()
+        if listener:
+            listener.close()
+        db.close()
 
-        except Exception as e:
-            job.status = ScrapeJobStatus.USER_SEEDED_FAILED
-            db.commit()
-            logger.error(
-                "Job id=%s username=%s failed: %s",
-                job.id,
-                job.entity_key,
-                e,
-            )
 
-    db.close()
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Seed profiles for PENDING PROFILE jobs.")
+    parser.add_argument("--follow", action="store_true", help="keep running and wait for new jobs")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="profiles fetched at once over the async client (default 1: blocking client)",
+    )
+    args = parser.parse_args()
+    run_worker(follow=args.follow, concurrency=args.concurrency)
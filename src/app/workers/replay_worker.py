@@ -0,0 +1,309 @@
+"""
+Offline replay of archived Instagram payloads.
+
+Runs the extractors and persistence again over the raw archive instead of
+the network. Feed pages go through build_post_rows / persist_rows_bulk, and
+web_profile_info payloads go through apply_profile_data. A process pool
+parses the segments. The parent process owns the DB connection and writes
+in large set-based batches, in archive order, so the newest payload wins.
+
+Use it to backfill new columns or apply an extractor fix without sending
+any Instagram requests. --dry-run parses without writing, which makes it a
+throughput benchmark for the parse half of post_seed_worker.
+
+    python -m src.app.workers.replay_worker [--workers N] [--username U] [--dry-run]
+"""
+
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from src.app.core.db.models import User
+from src.app.core.db.session import SessionLocal
+from src.app.core.logging_config import logger
+from src.app.instagram.archive import RawArchive, archive
+from src.app.workers.post_seed_worker import build_post_rows, persist_rows_bulk
+from src.app.workers.profile_worker import apply_profile_data
+
+# Postgres caps a statement at 65535 bind parameters; PostMedia rows have 7
+REPLAY_MAX_MEDIA_ROWS = 8000
+# and PostsMetadata rows (build_post_rows) have 11
+REPLAY_POST_COLUMNS = 11
+REPLAY_MAX_POST_ROWS = 65535 // REPLAY_POST_COLUMNS
+
+# Segments parsed or queued per parse worker while the writer catches up
+REPLAY_WINDOW_PER_WORKER = 2
+
+# (ig_pk, username) of the account whose feed or profile a record belongs to
+Owner = Tuple[Optional[str], Optional[str]]
+
+
+@dataclass
+class ParsedChunk:
+    """
+    Rows extracted from a run of archive records. Post rows carry no
+    posted_by yet: owners are mapped to users.id in the parent process.
+    """
+    records: int = 0
+    pages: int = 0
+    parse_errors: int = 0
+    parse_seconds: float = 0.0
+    posts: List[Tuple[Owner, Dict, List[Dict]]] = field(default_factory=list)
+    profiles: List[Tuple[Owner, Dict]] = field(default_factory=list)
+
+
+@dataclass
+class ReplayStats:
+    records: int = 0
+    pages: int = 0
+    posts: int = 0
+    media: int = 0
+    new_posts: int = 0
+    profiles: int = 0
+    unknown_owner: int = 0
+    parse_errors: int = 0
+    parse_seconds: float = 0.0
+    persist_seconds: float = 0.0
+
+    def add_chunk(self, chunk: ParsedChunk) -> None:
+        self.records += chunk.records
+        self.pages += chunk.pages
+        self.parse_errors += chunk.parse_errors
+        self.parse_seconds += chunk.parse_seconds
+
+    def report(self, wall_seconds: float) -> str:
+        rate = self.posts / wall_seconds if wall_seconds else 0.0
+        return (
+            f"{self.records} records ({self.pages} feed pages, {self.profiles} profiles) -> "
+            f"{self.posts} posts ({self.new_posts} new), {self.media} media, "
+            f"{self.unknown_owner} skipped for unknown owner, {self.parse_errors} parse errors. "
+            f"Wall {wall_seconds:.1f}s, parse CPU {self.parse_seconds:.1f}s, "
+            f"persist {self.persist_seconds:.1f}s: {rate:.0f} posts/s"
+        )
+
+
+def parse_records(records: Iterable[Dict]) -> ParsedChunk:
+    """
+    Pure parse step over archive records, safe to run in a worker process.
+    """
+    chunk = ParsedChunk()
+    started_at = time.perf_counter()
+
+    for record in records:
+        chunk.records += 1
+        owner = (record.get("ig_pk"), record.get("username"))
+        payload = record.get("payload") or {}
+
+        if record.get("endpoint") == "web_profile_info":
+            user = (payload.get("data") or {}).get("user")
+            if user:
+                chunk.profiles.append((owner, user))
+            continue
+
+        if record.get("endpoint") != "feed":
+            continue
+
+        chunk.pages += 1
+        fetched_at = datetime.fromisoformat(record["fetched_at"])
+        for item in payload.get("items", []):
+            try:
+                rows = build_post_rows(item, None)
+            except Exception as e:
+                chunk.parse_errors += 1
+                logger.error(f"Error parsing archived item {item.get('code', 'unknown')}: {e}")
+                continue
+            if rows:
+                post_row, media_rows = rows
+                # When the payload was fetched, not when it was replayed
+                post_row["scraped_at"] = fetched_at
+                for media in media_rows:
+                    media["scraped_at"] = fetched_at
+                chunk.posts.append((owner, post_row, media_rows))
+
+    chunk.parse_seconds = time.perf_counter() - started_at
+    return chunk
+
+
+def parse_segment(root: str, segment: str) -> ParsedChunk:
+    """
+    Process-pool entry point: parses one whole segment.
+    """
+    return parse_records(RawArchive(root, segment_max_bytes=0).iter_segment(segment))
+
+
+def resolve_owner_ids(db: Session, owners: Iterable[Owner], cache: Dict[Owner, Optional[int]]) -> None:
+    """
+    Maps (ig_pk, username) owners to users.id with one query per batch.
+    Unknown owners are cached as None.
+    """
+    missing = {owner for owner in owners if owner not in cache}
+    if not missing:
+        return
+
+    pks = {pk for pk, _ in missing if pk}
+    usernames = {username for _, username in missing if username}
+    clauses = []
+    if pks:
+        clauses.append(User.ig_pk.in_(pks))
+    if usernames:
+        clauses.append(User.username.in_(usernames))
+
+    by_pk, by_username = {}, {}
+    if clauses:
+        for user_id, ig_pk, username in db.query(User.id, User.ig_pk, User.username).filter(or_(*clauses)):
+            if ig_pk:
+                by_pk[ig_pk] = user_id
+            by_username[username] = user_id
+
+    for pk, username in missing:
+        cache[(pk, username)] = by_pk.get(pk) or by_username.get(username)
+
+
+class ReplayWriter:
+    """
+    Buffers parsed rows and flushes them with persist_rows_bulk, one
+    transaction per batch.
+    """
+
+    def __init__(self, db: Session, stats: ReplayStats, batch_size: int):
+        self.db = db
+        self.stats = stats
+        if batch_size > REPLAY_MAX_POST_ROWS:
+            logger.warning(f"Batch size {batch_size} exceeds the bind parameter limit, using {REPLAY_MAX_POST_ROWS}")
+        self.batch_size = max(1, min(batch_size, REPLAY_MAX_POST_ROWS))
+        self.owner_ids: Dict[Owner, Optional[int]] = {}
+        self.post_rows: List[Dict] = []
+        self.media_rows: List[Dict] = []
+
+    def add(self, chunk: ParsedChunk) -> None:
+        started_at = time.perf_counter()
+        resolve_owner_ids(
+            self.db,
+            [owner for owner, _, _ in chunk.posts] + [owner for owner, _ in chunk.profiles],
+            self.owner_ids,
+        )
+
+        for owner, post_row, media_rows in chunk.posts:
+            user_id = self.owner_ids.get(owner)
+            if user_id is None:
+                self.stats.unknown_owner += 1
+                continue
+            post_row["posted_by"] = user_id
+            self.post_rows.append(post_row)
+            self.media_rows.extend(media_rows)
+            if len(self.post_rows) >= self.batch_size or len(self.media_rows) >= REPLAY_MAX_MEDIA_ROWS:
+                self.flush()
+
+        if chunk.profiles:
+            self.flush()
+            self._apply_profiles(chunk.profiles)
+
+        self.stats.persist_seconds += time.perf_counter() - started_at
+
+    def _apply_profiles(self, profiles: List[Tuple[Owner, Dict]]) -> None:
+        users = {
+            user.id: user
+            for user in self.db.query(User).filter(
+                User.id.in_({self.owner_ids.get(owner) for owner, _ in profiles} - {None})
+            )
+        }
+        for owner, data in profiles:
+            user = users.get(self.owner_ids.get(owner))
+            if user is None:
+                self.stats.unknown_owner += 1
+                continue
+            apply_profile_data(user, data)
+            self.stats.profiles += 1
+        self.db.commit()
+
+    def flush(self) -> None:
+        if not self.post_rows:
+            return
+        self.stats.new_posts += persist_rows_bulk(self.db, self.post_rows, self.media_rows, overwrite=True)
+        self.db.commit()
+        self.stats.posts += len(self.post_rows)
+        self.stats.media += len(self.media_rows)
+        self.post_rows, self.media_rows = [], []
+
+
+def iter_chunks(source: RawArchive, workers: int, username: Optional[str]) -> Iterator[ParsedChunk]:
+    """
+    Parsed chunks in archive order: one per segment, or a single chunk from
+    the index when replaying one user.
+    """
+    if username:
+        yield parse_records(source.iter_records(username=username))
+        return
+
+    segments = source.segment_names()
+    logger.info(f"Replaying {len(segments)} archive segments with {workers} parse workers")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # A bounded window of segments in flight, yielded in submit order: later
+        # payloads still overwrite earlier ones, and parsed chunks never pile up
+        # faster than the writer consumes them
+        window: Deque[Future] = deque()
+        for segment in segments:
+            window.append(pool.submit(parse_segment, str(source.root), segment))
+            if len(window) >= workers * REPLAY_WINDOW_PER_WORKER:
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
+
+
+def run_replay(
+    workers: Optional[int] = None,
+    username: Optional[str] = None,
+    batch_size: int = 1000,
+    dry_run: bool = False,
+) -> ReplayStats:
+    workers = workers or os.cpu_count() or 1
+    stats = ReplayStats()
+    started_at = time.perf_counter()
+
+    db = None if dry_run else SessionLocal()
+    writer = ReplayWriter(db, stats, batch_size) if db else None
+    try:
+        for chunk in iter_chunks(archive, workers, username):
+            stats.add_chunk(chunk)
+            if writer:
+                writer.add(chunk)
+            else:
+                stats.posts += len(chunk.posts)
+                stats.media += sum(len(media_rows) for _, _, media_rows in chunk.posts)
+                stats.profiles += len(chunk.profiles)
+        if writer:
+            writer.flush()
+    except Exception:
+        if db:
+            db.rollback()
+        raise
+    finally:
+        if db:
+            db.close()
+
+    logger.info(f"Replay {'(dry run) ' if dry_run else ''}finished: {stats.report(time.perf_counter() - started_at)}")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-parse and persist archived Instagram payloads.")
+    parser.add_argument("--workers", type=int, default=None, help="parse processes (default: CPU count)")
+    parser.add_argument("--username", help="replay only this user's records, via the archive index")
+    parser.add_argument("--batch-size", type=int, default=1000, help=f"posts per upsert statement (at most {REPLAY_MAX_POST_ROWS})")
+    parser.add_argument("--dry-run", action="store_true", help="parse only, no DB writes (benchmark)")
+    args = parser.parse_args()
+
+    run_replay(
+        workers=args.workers,
+        username=args.username,
+        batch_size=args.batch_size,
+        dry_run=args.dry_run,
+    )
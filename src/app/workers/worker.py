@@ -1,4 +1,3 @@
-import time
 import logging
 import re
 import requests
@@ -9,12 +8,25 @@ import instaloader
 from src.app.core.db.session import SessionLocal
 from src.app.core.config import settings
 from src.app.core.db.models import ScrapeJob,ScrapeJobStatus, ScrapeJobType
-from src.app.workers.post_worker import enqueue_profile_job
+from src.app.workers.post_worker import enqueue_profile_jobs
+from src.app.jobs.notify import JobListener
+from src.app.jobs.queue import (
+    POST_STAGE,
+    JobFailure,
+    LeaseHeartbeat,
+    claim_batch,
+    classify_failure,
+    fail_jobs,
+    finish_jobs,
+    reap_expired_leases,
+)
+from src.app.instagram.rate_governor import governor
+from src.app.services.url_canonical import canonical_shortcode
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-POLL_INTERVAL = 5  # seconds
+POLL_INTERVAL = settings.JOB_POLL_FALLBACK_SECONDS  # fallback poll when no NOTIFY arrives
 
 
 L = instaloader.Instaloader(
@@ -25,23 +37,29 @@ L = instaloader.Instaloader(
     save_metadata=False,
 )
 
-def fetch_next_job(db: Session) -> ScrapeJob | None:
-    return (
-        db.query(ScrapeJob)
-        .filter(
-            ScrapeJob.status == ScrapeJobStatus.PENDING,
-            ScrapeJob.job_type == ScrapeJobType.POST,
-        )
-        .order_by(ScrapeJob.created_at)
-        .with_for_update(skip_locked=True)
-        .first()
-    )
+def fetch_next_jobs(db: Session) -> list[ScrapeJob]:
+    """
+    Leases the next batch of POST jobs (already marked USER_CREATION_RUNNING).
+    """
+    return claim_batch(db, POST_STAGE, settings.JOB_CLAIM_BATCH_SIZE)
 
 
 def extract_username_from_post(post_url: str) -> str | None:
-    shortcode = post_url.rstrip("/").split("/")[-1]
-
-    post = instaloader.Post.from_shortcode(L.context, shortcode)
+    # POST jobs are keyed on the shortcode; older keys may still be URLs
+    shortcode = canonical_shortcode(post_url)
+    if not shortcode:
+        raise ValueError(f"Not an Instagram post: {post_url}")
+
+    # Instaloader has its own session: take the token explicitly
+    governor.acquire()
+    try:
+        post = instaloader.Post.from_shortcode(L.context, shortcode)
+    except instaloader.exceptions.TooManyRequestsException as e:
+        raise JobFailure(str(e), "rate_limited") from e
+    except instaloader.exceptions.LoginRequiredException as e:
+        raise JobFailure(str(e), "session_dead") from e
+    except instaloader.exceptions.ConnectionException as e:
+        raise JobFailure(str(e), "connection_error") from e
     return post.owner_username
 
 
@@ -51,6 +69,7 @@ def run_worker():
 
     # get the number of pending posts 
     db = SessionLocal()
+    reap_expired_leases(db)
     pending_posts_count = (
         db.query(ScrapeJob)
         .filter(
@@ -62,57 +81,75 @@ def run_worker():
     
     logger.info("Pending posts count: %d", pending_posts_count)
 
-    start_post = 1
-
-    while start_post <= pending_posts_count:
-        job: ScrapeJob | None = None
-
-        try:
-            job = fetch_next_job(db)
-
-            if not job:
-                db.close()
-                time.sleep(POLL_INTERVAL)
-                continue
-
-            logger.info("Picked job id=%s url=%s", job.id, job.entity_key)
-
-            # mark RUNNING
-            job.status = ScrapeJobStatus.USER_CREATION_RUNNING
-            db.commit()
-
-            # --- risky section ---
-            username = extract_username_from_post(job.entity_key)
-
-            logger.info(
-                "Job id=%s extracted username=%s",
-                job.id,
-                username,
-            )
-
-            if username:
-                enqueue_profile_job(username, db)
-
-            # mark USER_SEEDED, needs analysis
-            job.status = ScrapeJobStatus.USER_CREATED
-            db.commit()
-
-            start_post += 1
-
-        except Exception as e:
-            db.rollback()
-
-            if job:
-                job.status = ScrapeJobStatus.USER_CREATION_FAILED 
-                job.last_error = str(e)
-                db.commit()
-
-            logger.exception("Worker error")
-            start_post += 1
-        finally:
-            db.close()
-
-    logger.info("Worker finished")
+    # Idle until enqueue_post_jobs sends NOTIFY; POLL_INTERVAL is only the fallback
+    listener = JobListener(POST_STAGE.name)
+
+    try:
+        while True:
+            jobs: list[ScrapeJob] = []
+
+            try:
+                jobs = fetch_next_jobs(db)
+
+                if not jobs:
+                    listener.wait(POLL_INTERVAL)
+                    reap_expired_leases(db)
+                    continue
+
+                logger.info("Picked %d jobs: ids=%s", len(jobs), [job.id for job in jobs])
+
+                # Outcomes are recorded together, in one transaction, after the batch
+                outcomes = []
+                failures = []
+                usernames = []
+                session_dead = False
+                with LeaseHeartbeat([job.id for job in jobs]):
+                    for job in jobs:
+                        if session_dead:
+                            # Not attempted: released without spending an attempt
+                            failures.append((job, "Session Dead", "session_dead"))
+                            continue
+                        try:
+                            # --- risky section ---
+                            username = extract_username_from_post(job.entity_key)
+
+                            logger.info(
+                                "Job id=%s extracted username=%s",
+                                job.id,
+                                username,
+                            )
+
+                            if username:
+                                usernames.append(username)
+
+                            # mark USER_SEEDED, needs analysis
+                            outcomes.append((job, POST_STAGE.done, None))
+
+                        except Exception as e:
+                            logger.exception("Job id=%s failed", job.id)
+                            failure_class = classify_failure(e)
+                            failures.append((job, str(e), failure_class))
+                            session_dead = failure_class == "session_dead"
+
+                # One ON CONFLICT DO NOTHING insert, committed with the outcomes
+                if usernames:
+                    enqueue_profile_jobs(usernames, db)
+                finish_jobs(db, outcomes)
+                # Retried later with backoff, or DEAD after JOB_MAX_ATTEMPTS
+                fail_jobs(db, POST_STAGE, failures)
+
+                if session_dead:
+                    logger.critical("Session marked dead. Stopping post worker.")
+                    break
+
+            except Exception:
+                # Leases of unfinished jobs expire and the reaper requeues them
+                db.rollback()
+                logger.exception("Worker error")
+    finally:
+        listener.close()
+        db.close()
+        logger.info("Worker finished")
 
 if __name__ == "__main__":
     run_worker()
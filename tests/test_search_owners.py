@@ -0,0 +1,61 @@
+from src.app.services.search_owners import OwnerStats, extract_owners, owner_from_search_item
+
+
+def test_owner_from_likes_comments_snippet():
+    item = {
+        "title": 'Jane Doe on Instagram: "Sunset shoot"',
+        "snippet": '1,234 likes, 56 comments - janedoe on March 3, 2024: "Sunset shoot"',
+    }
+    assert owner_from_search_item(item) == "janedoe"
+
+
+def test_owner_from_handle_in_title():
+    assert owner_from_search_item({"title": 'Jane Doe (@jane.doe) on Instagram: "hi"'}) == "jane.doe"
+    assert owner_from_search_item({"title": "Jane Doe (@jane.doe) • Instagram reel"}) == "jane.doe"
+    assert owner_from_search_item({"title": '@janedoe on Instagram: "hi"'}) == "janedoe"
+
+
+def test_owner_from_metatags():
+    item = {
+        "title": "Bob on Instagram",
+        "pagemap": {"metatags": [{"og:description": "12 likes, 0 comments - bob.builder on January 1, 2024"}]},
+    }
+    assert owner_from_search_item(item) == "bob.builder"
+
+
+def test_caption_mention_in_parentheses_is_not_the_owner():
+    item = {
+        "title": 'Jane Doe on Instagram: "Sunset shoot with (@nikon) on Instagram"',
+        "snippet": "1,234 likes, 56 comments - janedoe on March 3, 2024: Sunset shoot",
+    }
+    assert owner_from_search_item(item) == "janedoe"
+    assert owner_from_search_item({"title": item["title"]}) is None
+
+
+def test_caption_follow_mention_is_not_the_owner():
+    assert owner_from_search_item({"title": 'Jane Doe on Instagram: "Follow @brand on Instagram"'}) is None
+    assert owner_from_search_item({"snippet": "Follow @brand on Instagram for more"}) is None
+
+
+def test_display_name_is_not_taken_for_a_handle():
+    assert owner_from_search_item({"title": 'Bob on Instagram: "great"'}) is None
+
+
+def test_extract_owners_falls_back_once_per_post():
+    items = [
+        {"link": "https://www.instagram.com/p/CqAAAAAAAAA/", "title": 'X on Instagram: "(@nikon)"'},
+        {"link": "https://www.instagram.com/reel/CqAAAAAAAAA/?igsh=1", "title": "nothing"},
+        {"link": "https://www.instagram.com/p/CqBBBBBBBBB/", "snippet": "3 likes, 1 comment - owner_b on May 1, 2024"},
+    ]
+    calls = []
+
+    def fallback(url):
+        calls.append(url)
+        return "owner_a"
+
+    stats = OwnerStats()
+    owners = extract_owners(items, fallback=fallback, stats=stats)
+
+    assert owners == {"CqAAAAAAAAA": "owner_a", "CqBBBBBBBBB": "owner_b"}
+    assert calls == ["https://www.instagram.com/p/CqAAAAAAAAA/"]
+    assert (stats.metadata, stats.fallback, stats.missed) == (1, 1, 0)
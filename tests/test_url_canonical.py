@@ -0,0 +1,31 @@
+from src.app.services.url_canonical import _shortcode_from_parsed, canonical_shortcode, canonical_shortcodes
+
+
+def test_post_url_forms_share_a_shortcode():
+    urls = [
+        "https://www.instagram.com/p/Cq1AbC2dEf3/",
+        "https://instagram.com/reel/Cq1AbC2dEf3?utm_source=ig_web_copy_link",
+        "https://www.instagram.com/reels/Cq1AbC2dEf3/",
+        "https://www.instagram.com/tv/Cq1AbC2dEf3/",
+        "https://www.instagram.com/janedoe/p/Cq1AbC2dEf3/",
+        "https://www.instagram.com:443/p/Cq1AbC2dEf3/",
+        "Cq1AbC2dEf3",
+    ]
+    assert {canonical_shortcode(url) for url in urls} == {"Cq1AbC2dEf3"}
+
+
+def test_non_post_paths_are_rejected():
+    urls = [
+        "https://www.instagram.com/reels/audio/123456789012345/",
+        "https://www.instagram.com/reels/audio/",
+        "https://www.instagram.com/p/audio",
+        "https://www.instagram.com/reels/explore/",
+        "https://www.instagram.com/p/ab/",
+        "https://www.instagram.com/janedoe/",
+        "https://example.com/p/Cq1AbC2dEf3/",
+        "audio",
+    ]
+    for url in urls:
+        assert canonical_shortcode(url) is None, url
+        assert _shortcode_from_parsed(url) is None, url
+    assert canonical_shortcodes(urls) == ([], urls)